@@ -1,5 +1,7 @@
 import os
 from celery import Celery
+from celery.signals import worker_init, worker_process_shutdown
+from prometheus_client import REGISTRY, CollectorRegistry, multiprocess, start_http_server
 
 # Django 설정 모듈 환경 변수 설정
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
@@ -13,6 +15,33 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 # Django의 모든 앱에서 Task를 자동으로 등록
 app.autodiscover_tasks()
 
+# temp 앱 하위 패키지의 tasks.py도 등록
+app.autodiscover_tasks(['temp.pdf', 'temp.pinecone', 'temp.text', 'temp.langchain'])
+
 @app.task(bind=True)
 def debug_task(self):
     print(f'Request: {self.request!r}')
+
+
+# Celery 워커의 Prometheus 지표 노출 (OpenAI/Pinecone 호출 대부분이 워커에서 실행되므로 별도 수집 대상)
+# PROMETHEUS_MULTIPROC_DIR이 설정되어 있으면 prefork 자식 프로세스들의 지표를 합쳐서 노출
+@worker_init.connect
+def start_metrics_server(**kwargs):
+    port = int(os.getenv("CELERY_METRICS_PORT", 9808))
+    if not port:
+        return
+
+    registry = REGISTRY
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    start_http_server(port, registry=registry)
+
+
+@worker_process_shutdown.connect
+def mark_metrics_process_dead(pid=None, **kwargs):
+    """
+    종료된 자식 프로세스의 gauge 지표를 집계에서 제외
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(pid or os.getpid())
@@ -0,0 +1,23 @@
+import os
+import shutil
+from prometheus_client import multiprocess
+
+# gunicorn 설정 (Dockerfile CMD)
+bind = "0.0.0.0:8000"
+workers = int(os.getenv("GUNICORN_WORKERS", 3))
+
+
+def on_starting(server):
+    """
+    이전 실행에서 남은 Prometheus 다중 프로세스 지표 파일 삭제
+    워커마다 별도 레지스트리를 가지므로 /metrics는 PROMETHEUS_MULTIPROC_DIR의 파일을 합쳐서 노출 (django_prometheus)
+    """
+    directory = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if directory:
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory, exist_ok=True)
+
+
+def child_exit(server, worker):
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(worker.pid)
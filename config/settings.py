@@ -148,6 +148,109 @@ PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 PINECONE_ENVIRONMENT = os.getenv("PINECONE_ENVIRONMENT")
 PINECONE_INDEX_NAME = os.getenv("PINECONE_INDEX_NAME")
 
+# 벡터 저장소 백엔드 (temp/pinecone/service.py get_pinecone_index)
+#   pinecone: Pinecone 호스팅 인덱스 (기본값)
+#   local   : memory-mapped NumPy 행렬 기반 로컬 인덱스 (temp/vector_store.py, 오프라인 실행/벤치마크용)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone")
+VECTOR_STORE_DIR = os.getenv("VECTOR_STORE_DIR", str(BASE_DIR / "vector_store"))  # 로컬 인덱스 저장 경로
+VECTOR_DIMENSION = int(os.getenv("VECTOR_DIMENSION", 1536))  # 임베딩 벡터 차원 수 (text-embedding-ada-002)
+
+# PDF 추출 설정
+PDF_INGEST_CONCURRENCY = int(os.getenv("PDF_INGEST_CONCURRENCY", 2))  # pdf_ingest 워커의 동시 작업 수 (celery -c)
+# 추출 하나당 병렬 추출 프로세스 수: 동시에 실행되는 추출끼리 CPU를 나눠 쓰도록 기본값은 CPU 수 / 동시 작업 수
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", max(1, (os.cpu_count() or 1) // max(1, PDF_INGEST_CONCURRENCY))))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", 40))  # 병렬 추출을 적용할 최소 페이지 수
+IMAGE_DECODE_WORKERS = int(os.getenv("IMAGE_DECODE_WORKERS", 4))  # 여러 이미지 업로드 시 병렬 디코딩 스레드 수
+
+# LibreOffice 변환 풀 설정 (pptx/docx -> pdf)
+LIBREOFFICE_BINARY = os.getenv("LIBREOFFICE_BINARY", "soffice")
+LIBREOFFICE_PYTHON = os.getenv("LIBREOFFICE_PYTHON", "/usr/bin/python3")  # uno 모듈이 설치된 python
+LIBREOFFICE_POOL_SIZE = int(os.getenv("LIBREOFFICE_POOL_SIZE", 1))  # 프로세스별 상주 인스턴스 수 (0이면 작업마다 실행)
+LIBREOFFICE_MAX_JOBS = int(os.getenv("LIBREOFFICE_MAX_JOBS", 50))  # 인스턴스 재시작 전 최대 변환 횟수
+LIBREOFFICE_JOB_TIMEOUT = int(os.getenv("LIBREOFFICE_JOB_TIMEOUT", 120))  # 변환 작업 하나의 제한 시간 (초)
+
+# 임베딩 캐시 설정 (Redis, LRU + TTL)
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", 100000))  # 최대 저장 벡터 수 (초과 시 가장 오래 안 쓴 항목부터 삭제)
+EMBEDDING_CACHE_TTL = int(os.getenv("EMBEDDING_CACHE_TTL", 60 * 60 * 24 * 30))  # 벡터 만료 시간 (초)
+
+# LLM 응답 캐시 설정 (ask_openai(cache=True) 호출에만 적용)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 20000))  # 최대 저장 응답 수 (초과 시 가장 오래 안 쓴 항목부터 삭제)
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", 60 * 60 * 24 * 7))  # 응답 만료 시간 (초)
+
+# 요약 생성 설정
+SUMMARY_MAX_WORKERS = int(os.getenv("SUMMARY_MAX_WORKERS", 8))  # 청크 요약을 동시에 요청하는 최대 스레드 수
+
+# OpenAI 백엔드 설정 (temp/openai_backend.py)
+#   openai: 실제 API, fake: 네트워크 없는 가짜 응답, record: 실제 응답 기록, replay: 기록된 응답 재생
+OPENAI_BACKEND = os.getenv("OPENAI_BACKEND", "openai")
+OPENAI_RECORDINGS_DIR = os.getenv("OPENAI_RECORDINGS_DIR", str(BASE_DIR / "openai_recordings"))
+OPENAI_REPLAY_LATENCY = os.getenv("OPENAI_REPLAY_LATENCY", "false").lower() == "true"  # 재생 시 기록된 지연 시간만큼 대기
+OPENAI_FAKE_LATENCY_MS = float(os.getenv("OPENAI_FAKE_LATENCY_MS", 0))  # 가짜 응답 평균 지연 시간 (ms)
+OPENAI_FAKE_LATENCY_JITTER_MS = float(os.getenv("OPENAI_FAKE_LATENCY_JITTER_MS", 0))  # 지연 시간 표준편차 (ms)
+OPENAI_FAKE_ERROR_RATE = float(os.getenv("OPENAI_FAKE_ERROR_RATE", 0))  # 가짜 오류 발생 비율 (0 ~ 1)
+OPENAI_FAKE_EMBEDDING_DIM = int(os.getenv("OPENAI_FAKE_EMBEDDING_DIM", 1536))
+OPENAI_FAKE_RESPONSES_FILE = os.getenv("OPENAI_FAKE_RESPONSES_FILE")  # [{"pattern": 정규식, "response": 응답}] JSON 파일
+
+# 외부 API(OpenAI, Pinecone) 재시도 및 서킷 브레이커 설정 (temp/resilience.py)
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", 4))  # 429/5xx/연결 오류 시 최대 시도 횟수
+RETRY_BACKOFF_BASE = float(os.getenv("RETRY_BACKOFF_BASE", 0.5))  # 백오프 기본 대기 시간 (초)
+RETRY_BACKOFF_CAP = float(os.getenv("RETRY_BACKOFF_CAP", 20))  # 백오프 최대 대기 시간 (초)
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", 5))  # 연속 실패 몇 번에 차단할지
+CIRCUIT_RECOVERY_TIMEOUT = float(os.getenv("CIRCUIT_RECOVERY_TIMEOUT", 30))  # 차단 후 시험 요청까지 대기 시간 (초)
+OPENAI_CALL_DEADLINE = float(os.getenv("OPENAI_CALL_DEADLINE", 120))  # OpenAI 호출 하나의 재시도 포함 허용 시간 (초)
+PINECONE_CALL_DEADLINE = float(os.getenv("PINECONE_CALL_DEADLINE", 30))  # Pinecone 호출 하나의 재시도 포함 허용 시간 (초)
+
+# Pinecone 업로드(인제스트) 배치 설정 (temp/pinecone/service.py ingest_pages)
+INGEST_BATCH_PAGES = int(os.getenv("INGEST_BATCH_PAGES", 100))  # 한 번에 임베딩하고 업로드하는 페이지 수
+INGEST_CONCURRENCY = int(os.getenv("INGEST_CONCURRENCY", 4))  # 동시에 처리하는 배치 수 (1이면 순차 처리)
+PINECONE_UPSERT_MAX_RECORDS = int(os.getenv("PINECONE_UPSERT_MAX_RECORDS", 1000))  # upsert 요청 하나의 최대 벡터 수
+PINECONE_UPSERT_MAX_BYTES = int(os.getenv("PINECONE_UPSERT_MAX_BYTES", 2 * 1024 * 1024))  # upsert 요청 하나의 최대 크기 (바이트)
+
+# LLM 호출 종류별 모델 라우팅 (openaiService.ask_openai_routed)
+#   model: 기본 모델, fallback_model: 요청 실패 또는 응답 형식 오류 시 다시 요청할 모델
+#   max_tokens: 최대 응답 토큰 수, timeout: 요청 하나의 제한 시간 (초), deadline: 재시도 포함 허용 시간 (초)
+LLM_ROUTES = {
+    # 정답 여부(True/False)만 받는 짧은 채점: 가장 빠르고 저렴한 모델 사용
+    "grading": {
+        "model": os.getenv("LLM_GRADING_MODEL", "gpt-4o-mini"),
+        "fallback_model": os.getenv("LLM_GRADING_FALLBACK_MODEL", "gpt-3.5-turbo"),
+        "max_tokens": 5,
+        "temperature": 0,
+        "timeout": int(os.getenv("LLM_GRADING_TIMEOUT", 10)),
+        "deadline": int(os.getenv("LLM_GRADING_DEADLINE", 20)),
+    },
+    "explanation": {
+        "model": os.getenv("LLM_EXPLANATION_MODEL", "gpt-3.5-turbo"),
+        "fallback_model": os.getenv("LLM_EXPLANATION_FALLBACK_MODEL") or None,
+        "max_tokens": 1024,
+        "temperature": 0.7,
+        "timeout": int(os.getenv("LLM_EXPLANATION_TIMEOUT", 60)),
+        "deadline": int(os.getenv("LLM_EXPLANATION_DEADLINE", 120)),
+    },
+    "question_generation": {
+        "model": os.getenv("LLM_GENERATION_MODEL", "gpt-3.5-turbo"),
+        "fallback_model": os.getenv("LLM_GENERATION_FALLBACK_MODEL") or None,
+        "max_tokens": 4096,
+        "temperature": 0.7,
+        "timeout": int(os.getenv("LLM_GENERATION_TIMEOUT", 180)),
+        "deadline": int(os.getenv("LLM_GENERATION_DEADLINE", 300)),
+    },
+}
+
+# RAG 컨텍스트 예산 설정 (문제 생성 프롬프트에 넣을 검색 결과 크기)
+RAG_CONTEXT_TOKEN_BUDGET = int(os.getenv("RAG_CONTEXT_TOKEN_BUDGET", 6000))  # 토픽 관련 텍스트 전체 토큰 예산 (토픽 수로 나누어 배분)
+RAG_GENEALOGY_TOKEN_BUDGET = int(os.getenv("RAG_GENEALOGY_TOKEN_BUDGET", 2000))  # 족보(genealogy) 텍스트 토큰 예산
+RAG_NEAR_DUPLICATE_RATIO = float(os.getenv("RAG_NEAR_DUPLICATE_RATIO", 0.9))  # 이 유사도 이상인 문단은 중복으로 보고 제거
+RAG_QUERY_MAX_WORKERS = int(os.getenv("RAG_QUERY_MAX_WORKERS", 8))  # 토픽별 벡터 검색을 동시에 보내는 최대 스레드 수
+
+# 하이브리드 검색 (BM25 키워드 역색인 + 벡터 검색, temp/keyword_index.py, temp/rag.py)
+HYBRID_SEARCH_ENABLED = os.getenv("HYBRID_SEARCH_ENABLED", "true").lower() == "true"
+BM25_K1 = float(os.getenv("BM25_K1", 1.2))  # 단어 빈도 포화 정도
+BM25_B = float(os.getenv("BM25_B", 0.75))  # 문서 길이 정규화 정도
+RRF_K = int(os.getenv("RRF_K", 60))  # Reciprocal Rank Fusion 순위 상수
+
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
@@ -208,4 +311,11 @@ CELERY_RESULT_BACKEND = 'redis://redis:6379/0'  # Redis 백엔드
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'
+# 업로드 파일 처리(PDF 추출)는 별도 큐로 보내 스레드 풀 워커에서 실행
+# prefork 워커의 자식 프로세스는 데몬이라 프로세스 풀을 만들 수 없어 병렬 추출(PDF_EXTRACT_WORKERS)이 동작하지 않음
+# 실행 예: celery -A config worker -Q pdf_ingest -P threads -c 2 (-c는 PDF_INGEST_CONCURRENCY와 맞춤)
+CELERY_PDF_INGEST_QUEUE = os.getenv("CELERY_PDF_INGEST_QUEUE", "pdf_ingest")
+CELERY_TASK_ROUTES = {
+    "temp.pdf.tasks.ingest_uploaded_file_task": {"queue": CELERY_PDF_INGEST_QUEUE},
+}
 X_FRAME_OPTIONS = 'ALLOWALL'
\ No newline at end of file
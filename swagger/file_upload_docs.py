@@ -2,26 +2,26 @@ from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 
 pdf_upload_doc = swagger_auto_schema(
-    operation_description="Upload a PDF file, extract text, and save to Redis.",
+    operation_description="Upload a file (pdf, pptx, docx, jpg, png) and start a background job that extracts text to Redis.",
     manual_parameters=[
         openapi.Parameter(
             'file',
             openapi.IN_FORM,
-            description="The PDF file to upload",
+            description="The file to upload. Send several images under the same field to merge them into one PDF",
             type=openapi.TYPE_FILE,
             required=True
         ),
     ],
     responses={
-        201: openapi.Response("File uploaded and text extracted successfully"),
-        400: openapi.Response("No file provided"),
+        202: openapi.Response("File uploaded. Poll /api/pdf/jobs/<job_id> for extraction progress"),
+        400: openapi.Response("No file provided or unsupported file type"),
         401: openapi.Response("Unauthorized: Token is missing or invalid"),
         500: openapi.Response("Failed to process PDF"),
     }
 )
 
 genealogy_upload_doc = swagger_auto_schema(
-    operation_description="PDF 파일을 업로드하고, 텍스트를 추출하여 Redis에 저장합니다.",
+    operation_description="족보 파일을 업로드하고 텍스트 추출 작업을 시작하거나, 텍스트를 Redis에 저장합니다.",
     manual_parameters=[
         openapi.Parameter(
             'file',
@@ -39,7 +39,8 @@ genealogy_upload_doc = swagger_auto_schema(
         ),
     ],
     responses={
-        201: openapi.Response("파일이 업로드되고 텍스트가 성공적으로 추출되었습니다."),
+        201: openapi.Response("텍스트가 성공적으로 저장되었습니다."),
+        202: openapi.Response("파일이 업로드되었습니다. /api/pdf/jobs/<job_id>로 추출 진행 상황을 조회하세요."),
         400: openapi.Response("파일이 제공되지 않았습니다."),
         401: openapi.Response("인증 실패: 토큰이 없거나 유효하지 않습니다."),
         500: openapi.Response("PDF 처리에 실패했습니다."),
@@ -0,0 +1,108 @@
+import logging
+import time
+from config.settings import redis_client
+
+logger = logging.getLogger(__name__)
+
+# Redis 캐시 하나의 키 구성
+#   cache:{namespace}:{digest}    -> 값 (bytes, TTL 적용)
+#   cache:{namespace}:lru         -> ZSET (member: digest, score: 마지막 사용 시각)
+#   cache:{namespace}:stats       -> 해시 (hits, misses, evictions)
+# 항목 수가 max_entries를 넘으면 마지막 사용 시각이 가장 오래된 항목부터 삭제
+
+
+class RedisLRUCache:
+    """
+    크기 제한(LRU)과 TTL이 있는 Redis 캐시
+    Redis 오류는 캐시 미스로 처리하므로 캐시 장애가 호출 측 작업을 실패시키지 않음
+    """
+
+    def __init__(self, namespace, max_entries, ttl):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.lru_key = f"cache:{namespace}:lru"
+        self.stats_key = f"cache:{namespace}:stats"
+
+    def value_key(self, digest):
+        return f"cache:{self.namespace}:{digest}"
+
+    def get_many(self, digests):
+        """
+        Returns:
+            list: digest 순서대로 저장된 값 (없으면 None)
+        """
+        if not digests:
+            return []
+
+        try:
+            values = redis_client.mget([self.value_key(digest) for digest in digests])
+
+            hits = {digest: time.time() for digest, value in zip(digests, values) if value is not None}
+            expired = [digest for digest, value in zip(digests, values) if value is None]
+
+            pipe = redis_client.pipeline()
+            if hits:
+                pipe.zadd(self.lru_key, hits)  # 마지막 사용 시각 갱신
+            if expired:
+                pipe.zrem(self.lru_key, *expired)  # TTL로 만료된 항목 정리
+            pipe.hincrby(self.stats_key, "hits", len(hits))
+            pipe.hincrby(self.stats_key, "misses", len(expired))
+            pipe.execute()
+            return values
+
+        except Exception as e:
+            logger.warning(f"Cache read failed ({self.namespace}): {str(e)}")
+            return [None] * len(digests)
+
+    def get(self, digest):
+        return self.get_many([digest])[0]
+
+    def set_many(self, mapping):
+        """
+        Args:
+            mapping: {digest: 값(bytes)}
+        """
+        if not mapping:
+            return
+
+        try:
+            now = time.time()
+            pipe = redis_client.pipeline()
+            for digest, value in mapping.items():
+                pipe.set(self.value_key(digest), value, ex=self.ttl)
+            pipe.zadd(self.lru_key, {digest: now for digest in mapping})
+            pipe.execute()
+
+            self._evict()
+
+        except Exception as e:
+            logger.warning(f"Cache write failed ({self.namespace}): {str(e)}")
+
+    def set(self, digest, value):
+        self.set_many({digest: value})
+
+    def _evict(self):
+        overflow = redis_client.zcard(self.lru_key) - self.max_entries
+        if overflow <= 0:
+            return
+
+        evicted = [member.decode("utf-8") for member, _ in redis_client.zpopmin(self.lru_key, overflow)]
+        if evicted:
+            pipe = redis_client.pipeline()
+            pipe.delete(*[self.value_key(digest) for digest in evicted])
+            pipe.hincrby(self.stats_key, "evictions", len(evicted))
+            pipe.execute()
+
+    def stats(self):
+        """
+        Returns:
+            dict: hits, misses, evictions, entries
+        """
+        raw = redis_client.hgetall(self.stats_key)
+        stats = {field.decode("utf-8"): int(value) for field, value in raw.items()}
+        stats.setdefault("hits", 0)
+        stats.setdefault("misses", 0)
+        stats.setdefault("evictions", 0)
+        stats["entries"] = redis_client.zcard(self.lru_key)
+        return stats
@@ -0,0 +1,134 @@
+import re
+import tiktoken
+from functools import lru_cache
+
+DEFAULT_MODEL = "gpt-3.5-turbo"
+
+# 모델별 컨텍스트 윈도우 (입력 + 출력 토큰)
+MODEL_CONTEXT_TOKENS = {
+    "gpt-3.5-turbo": 16385,
+    "gpt-3.5-turbo-16k": 16385,
+    "gpt-4": 8192,
+    "gpt-4-turbo": 128000,
+    "gpt-4o": 128000,
+    "gpt-4o-mini": 128000,
+    "text-embedding-ada-002": 8191,
+}
+
+# 문장 경계: 마침표류 뒤의 공백, 또는 마침표 없이 끝나는 한국어 평서문/의문문 어미 뒤의 공백
+SENTENCE_BOUNDARY = re.compile(
+    r"(?<=[.!?。！？…])\s+"
+    r"|(?<=[니이한된했였었있없같않]다)\s+"
+    r"|(?<=[니까세요죠]요)\s+"
+)
+PARAGRAPH_BOUNDARY = re.compile(r"\n\s*\n")
+
+
+@lru_cache(maxsize=None)
+def _encoding(model):
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text, model=DEFAULT_MODEL):
+    if not text:
+        return 0
+    return len(_encoding(model).encode(text))
+
+
+def context_window(model=DEFAULT_MODEL):
+    return MODEL_CONTEXT_TOKENS.get(model, 4096)
+
+
+def _split_by_tokens(text, max_tokens, model):
+    """
+    경계 없이 토큰 수 기준으로 텍스트를 잘라 max_tokens 이하 조각 목록으로 반환
+    """
+    encoding = _encoding(model)
+    tokens = encoding.encode(text)
+    return [encoding.decode(tokens[i:i + max_tokens]) for i in range(0, len(tokens), max_tokens)]
+
+
+def normalize_text(text):
+    """
+    줄 안의 연속 공백을 하나로 줄이고 빈 줄은 문단 구분(빈 줄 하나)으로 정리
+    문단/줄 구분은 청크 경계로 쓰기 위해 유지
+    """
+    paragraphs = []
+    for paragraph in PARAGRAPH_BOUNDARY.split(text):
+        lines = [" ".join(line.split()) for line in paragraph.split("\n")]
+        paragraph = "\n".join(line for line in lines if line)
+        if paragraph:
+            paragraphs.append(paragraph)
+    return "\n\n".join(paragraphs)
+
+
+def split_sentences(text):
+    """
+    문단 -> 줄 -> 문장 순으로 나누어 (문장, 뒤에 붙일 구분자) 목록으로 반환
+    """
+    units = []
+    for paragraph in PARAGRAPH_BOUNDARY.split(text):
+        lines = [line.strip() for line in paragraph.split("\n") if line.strip()]
+        for line_index, line in enumerate(lines):
+            sentences = [sentence for sentence in SENTENCE_BOUNDARY.split(line) if sentence]
+            for sentence_index, sentence in enumerate(sentences):
+                if sentence_index < len(sentences) - 1:
+                    units.append((sentence, " "))
+                elif line_index < len(lines) - 1:
+                    units.append((sentence, "\n"))
+                else:
+                    units.append((sentence, "\n\n"))
+    return units
+
+
+def chunk_text(text, max_tokens, overlap_tokens=0, model=DEFAULT_MODEL):
+    """
+    문단/문장 경계를 기준으로 텍스트를 max_tokens 토큰 이하의 청크로 분할
+    Args:
+        text (str): 입력 텍스트
+        max_tokens (int): 청크 하나의 최대 토큰 수
+        overlap_tokens (int): 이전 청크 끝에서 다음 청크 앞에 반복할 최대 토큰 수
+    Returns:
+        list: 분할된 텍스트 조각 리스트
+    """
+    units = []
+    for sentence, separator in split_sentences(text):
+        tokens = count_tokens(sentence, model)
+        if tokens <= max_tokens:
+            units.append((sentence, separator, tokens))
+        else:
+            # 한 문장이 청크보다 길면 토큰 단위로 강제 분할
+            pieces = _split_by_tokens(sentence, max_tokens, model)
+            for piece in pieces[:-1]:
+                units.append((piece, "", count_tokens(piece, model)))
+            units.append((pieces[-1], separator, count_tokens(pieces[-1], model)))
+
+    chunks = []
+    current = []
+    current_tokens = 0
+
+    for unit in units:
+        if current and current_tokens + unit[2] > max_tokens:
+            chunks.append("".join(sentence + separator for sentence, separator, _ in current).strip())
+
+            # 이전 청크의 마지막 문장들을 overlap_tokens 이내에서 다음 청크 앞에 반복
+            overlap = []
+            overlap_size = 0
+            for previous in reversed(current):
+                if overlap_size + previous[2] > overlap_tokens or overlap_size + previous[2] + unit[2] > max_tokens:
+                    break
+                overlap.insert(0, previous)
+                overlap_size += previous[2]
+            current = overlap
+            current_tokens = overlap_size
+
+        current.append(unit)
+        current_tokens += unit[2]
+
+    if current:
+        chunks.append("".join(sentence + separator for sentence, separator, _ in current).strip())
+
+    return chunks
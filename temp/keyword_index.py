@@ -0,0 +1,177 @@
+import json
+import logging
+import math
+import re
+import zlib
+from collections import Counter
+from django.conf import settings
+from config.settings import redis_client
+
+logger = logging.getLogger(__name__)
+
+# 사용자(네임스페이스)별 BM25 키워드 역색인 (Redis)
+#   bm25:{namespace}:term:{term} -> 해시 {문서 ID: 단어 빈도}
+#   bm25:{namespace}:lengths     -> 해시 {문서 ID: 문서 길이(토큰 수)}
+#   bm25:{namespace}:docs        -> 해시 {문서 ID: zlib 압축 JSON {"terms"}}
+#   bm25:{namespace}:stats       -> 해시 {doc_count, total_length}
+# 문서 ID는 벡터 인덱스의 레코드 ID와 같게 두어 벡터 검색 결과와 합칠 수 있게 함
+# 원문/메타데이터는 저장하지 않음 (말뭉치 사본 방지): 검색 결과는 ID와 점수만 반환하고 원문은 벡터 인덱스에서 fetch
+# 같은 ID로 다시 색인하면 이전 단어 빈도를 먼저 빼고 새로 더함
+# 하이브리드 검색을 켜기 전에 업로드된 페이지는 색인되어 있지 않음 (벡터 검색으로만 검색, 다시 업로드하면 색인)
+#
+# 토크나이저: 영문/숫자 단어는 통째로 (약어, 공식 이름, 과목 코드), 한글은 글자 2-gram (한 글자 단어는 1-gram)
+# 조사/어미가 붙어도 어간 쪽 2-gram이 겹치므로 형태소 분석기 없이 부분 일치 검색이 가능
+
+HANGUL_RUN = re.compile(r"[가-힣]+")
+WORD_RUN = re.compile(r"[a-z0-9]+(?:[._+\-][a-z0-9]+)*")
+NGRAM_SIZE = 2
+
+
+def tokenize(text):
+    """
+    텍스트를 BM25 단어 목록으로 변환 (영문 소문자 단어 + 한글 글자 2-gram)
+    """
+    text = (text or "").lower()
+    tokens = WORD_RUN.findall(text)
+    for run in HANGUL_RUN.findall(text):
+        if len(run) < NGRAM_SIZE:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + NGRAM_SIZE] for i in range(len(run) - NGRAM_SIZE + 1))
+    return tokens
+
+
+def _key(namespace, name):
+    return f"bm25:{namespace}:{name}"
+
+
+def _term_key(namespace, term):
+    return _key(namespace, f"term:{term}")
+
+
+def _encode(data):
+    return zlib.compress(json.dumps(data, ensure_ascii=False).encode("utf-8"))
+
+
+def _decode(raw):
+    return json.loads(zlib.decompress(raw).decode("utf-8"))
+
+
+def index_documents(namespace, documents):
+    """
+    문서를 역색인에 추가 (같은 ID가 있으면 교체)
+    Args:
+        namespace (str): 사용자 네임스페이스 (벡터 인덱스 네임스페이스와 동일)
+        documents: [{"id", "text"}] 목록
+    """
+    if not documents:
+        return
+
+    # 다시 색인되는 문서의 이전 단어 빈도를 빼기 위해 기존 항목 조회
+    ids = [document["id"] for document in documents]
+    previous = dict(zip(ids, redis_client.hmget(_key(namespace, "docs"), ids)))
+    previous_lengths = dict(zip(ids, redis_client.hmget(_key(namespace, "lengths"), ids)))
+
+    pipe = redis_client.pipeline(transaction=False)
+    doc_count_delta = 0
+    length_delta = 0
+    for document in documents:
+        doc_id = document["id"]
+        if previous.get(doc_id):
+            for term in _decode(previous[doc_id])["terms"]:
+                pipe.hdel(_term_key(namespace, term), doc_id)
+            length_delta -= int(previous_lengths.get(doc_id) or 0)
+        else:
+            doc_count_delta += 1
+
+        frequencies = Counter(tokenize(document["text"]))
+        for term, frequency in frequencies.items():
+            pipe.hset(_term_key(namespace, term), doc_id, frequency)
+
+        length = sum(frequencies.values())
+        length_delta += length
+        pipe.hset(_key(namespace, "lengths"), doc_id, length)
+        pipe.hset(_key(namespace, "docs"), doc_id, _encode({"terms": list(frequencies)}))
+
+    pipe.hincrby(_key(namespace, "stats"), "doc_count", doc_count_delta)
+    pipe.hincrby(_key(namespace, "stats"), "total_length", length_delta)
+    pipe.execute()
+
+
+def delete_namespace(namespace):
+    """
+    네임스페이스의 역색인 전체 삭제 (SCAN으로 키를 찾아 나누어 삭제)
+    """
+    batch = []
+    for key in redis_client.scan_iter(match=_key(namespace, "*"), count=1000):
+        batch.append(key)
+        if len(batch) >= 1000:
+            redis_client.delete(*batch)
+            batch = []
+    if batch:
+        redis_client.delete(*batch)
+
+
+def compact_documents(batch_size=1000):
+    """
+    이전 형식(metadata 포함)으로 저장된 문서 항목에서 metadata를 제거 (rebuild_redis_index 명령에서 사용)
+    Returns:
+        int: 변환한 문서 항목 수
+    """
+    compacted = 0
+    for docs_key in redis_client.scan_iter(match=_key("*", "docs"), count=batch_size):
+        updates = {}
+        for doc_id, raw in redis_client.hscan_iter(docs_key, count=batch_size):
+            document = _decode(raw)
+            if "metadata" in document:
+                updates[doc_id] = _encode({"terms": document["terms"]})
+            if len(updates) >= batch_size:
+                redis_client.hset(docs_key, mapping=updates)
+                compacted += len(updates)
+                updates = {}
+        if updates:
+            redis_client.hset(docs_key, mapping=updates)
+            compacted += len(updates)
+    return compacted
+
+
+def search(namespace, query, top_k=10):
+    """
+    BM25 점수 상위 top_k개 문서 검색 (원문은 벡터 인덱스에서 가져와야 함)
+    Returns:
+        list: 점수 높은 순 [{"id", "score"}]
+    """
+    terms = list(dict.fromkeys(tokenize(query)))
+    if not terms:
+        return []
+
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.hmget(_key(namespace, "stats"), ["doc_count", "total_length"])
+    for term in terms:
+        pipe.hgetall(_term_key(namespace, term))
+    stats, *postings = pipe.execute()
+
+    doc_count = int(stats[0] or 0)
+    if doc_count <= 0:
+        return []
+    average_length = max(int(stats[1] or 0) / doc_count, 1.0)
+
+    candidates = {doc_id for posting in postings for doc_id in posting}
+    if not candidates:
+        return []
+    candidates = list(candidates)
+    lengths = dict(zip(candidates, redis_client.hmget(_key(namespace, "lengths"), candidates)))
+
+    k1 = settings.BM25_K1
+    b = settings.BM25_B
+    scores = Counter()
+    for posting in postings:
+        if not posting:
+            continue
+        idf = math.log(1 + (doc_count - len(posting) + 0.5) / (len(posting) + 0.5))
+        for doc_id, raw_frequency in posting.items():
+            frequency = int(raw_frequency)
+            length = int(lengths.get(doc_id) or average_length)
+            scores[doc_id] += idf * frequency * (k1 + 1) / (frequency + k1 * (1 - b + b * length / average_length))
+
+    return [{"id": doc_id.decode("utf-8"), "score": score} for doc_id, score in scores.most_common(top_k)]
@@ -1,54 +1,31 @@
 import os
 from django.conf import settings
-from pinecone import Pinecone, ServerlessSpec
+from temp.pinecone.service import get_pinecone_instance, get_pinecone_index
 from temp.openaiService import generate_summary, get_embedding
+from temp.rag import hybrid_search
 from user.models import UserSummary  # Django 모델 (MySQL 저장)
 from io import BytesIO
 from .utils import text_to_pdf
 from .models import SummaryPDF
 
-# Pinecone 인스턴스 생성
-def get_pinecone_instance():
-    return Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-
-
-# Pinecone 인덱스 생성 또는 가져오기
-def get_pinecone_index(instance, index_name):
-    if index_name not in [i.name for i in instance.list_indexes()]:
-        spec = ServerlessSpec(
-            cloud="aws",
-            region=os.getenv("PINECONE_ENVIRONMENT"),
-        )
-        instance.create_index(
-            name=index_name,
-            dimension=1536,
-            metric="cosine",
-            spec=spec,
-        )
-    return instance.Index(index_name)
-
-
 # 특정 사용자(user_id)의 모든 데이터를 Pinecone에서 가져오기
-def get_user_data_by_topic(instance, index_name, user_id, topic):
+def get_user_data_by_topic(instance, index_name, user_id, topic, topic_embedding=None):
     """
     Pinecone에서 특정 사용자가 올린 데이터 중 주제와 관련된 데이터를 가져옵니다.
+    topic_embedding이 주어지면 임베딩 요청 없이 그대로 사용합니다.
     """
     try:
         index = get_pinecone_index(instance, index_name)
 
         # topic에 대한 임베딩 벡터 생성
-        topic_embedding = get_embedding(topic)
-
-        # Pinecone 쿼리를 통해 데이터 검색
-        response = index.query(
-            vector=topic_embedding,
-            namespace=str(user_id),  # 유저 ID로 네임스페이스 필터링
-            top_k=10,  # 최대 top_k개의 결과 반환
-            include_metadata=True,  # 메타데이터 포함
-        )
+        if topic_embedding is None:
+            topic_embedding = get_embedding(topic, call_site="summary_retrieval", user_id=user_id)
+
+        # 벡터 검색과 키워드(BM25) 검색 결과를 합쳐 상위 10개 선택 (유저 ID로 네임스페이스 필터링)
+        matches = hybrid_search(index, str(user_id), topic, topic_embedding, top_k=10)
 
         # 검색 결과 데이터 추출
-        if not response or "matches" not in response or len(response["matches"]) == 0:
+        if not matches:
             return None  # 데이터가 없으면 None 반환
 
         # 메타데이터에서 텍스트 추출
@@ -58,19 +35,35 @@ def get_user_data_by_topic(instance, index_name, user_id, topic):
                 "file_name": match["metadata"].get("file_name", "unknown"),
                 "page_number": match["metadata"].get("page_number", 0),
             }
-            for match in response["matches"]
-            if "metadata" in match and "original_text" in match["metadata"]
+            for match in matches
         ]
 
     except Exception as e:
         raise RuntimeError(f"Error querying user data by topic from Pinecone: {e}")
 
+# 토픽 관련 원문 텍스트 가져오기
+def get_topic_text(user_id, topic, topic_embedding=None):
+    """
+    Pinecone에서 토픽과 관련된 사용자 데이터를 찾아 요약할 하나의 텍스트로 합칩니다.
+    Returns:
+        str: 합친 원문 텍스트 (관련 데이터가 없으면 None)
+    """
+    instance = get_pinecone_instance()
+    index_name = os.getenv("PINECONE_INDEX_NAME", "teamf")
+
+    user_data = get_user_data_by_topic(instance, index_name, user_id, topic, topic_embedding=topic_embedding)
+    if not user_data:
+        return None
+
+    return "\n".join([data["original_text"] for data in user_data])
+
+
 # 요약 생성
-def summarize_text_with_gpt(text_chunk):
+def summarize_text_with_gpt(text_chunk, user_id=None):
     """
     GPT를 사용하여 텍스트를 요약합니다.
     """
-    return generate_summary(text_chunk)
+    return generate_summary(text_chunk, user_id=user_id)
 
 
 # 결과 저장
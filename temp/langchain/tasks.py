@@ -1,8 +1,9 @@
-from .services import get_pinecone_instance, save_summaries_to_pdf, summarize_text_with_gpt
+from .services import get_pinecone_instance, get_pinecone_index, save_summaries_to_pdf, summarize_text_with_gpt
 import os
 from celery import shared_task
-from temp.langchain.services import get_user_data_by_topic
-from temp.openaiService import generate_summary
+from temp.langchain.services import get_user_data_by_topic, get_topic_text
+from temp import keyword_index
+from temp.openaiService import generate_summary, get_embeddings
 from user.models import UserSummary  # Django 모델 import
 
 
@@ -28,7 +29,7 @@ def process_summary_task(user_id, topic):
 
         # 원본 텍스트들을 합쳐 요약 생성
         combined_text = "\n".join([data["original_text"] for data in user_data])
-        summary_result = generate_summary(combined_text)
+        summary_result = generate_summary(combined_text, user_id=user_id)
 
         # 요약 생성 성공 여부 확인
         if summary_result["success"]:
@@ -67,11 +68,12 @@ def delete_user_data_from_pinecone(user_id):
         # Pinecone 인스턴스 가져오기
         instance = get_pinecone_instance()
         index_name = os.getenv("PINECONE_INDEX_NAME", "pdf-index")
-        index = instance.Index(index_name)
+        index = get_pinecone_index(instance, index_name)
 
         # 해당 사용자 ID 네임스페이스에서 모든 데이터 삭제
         namespace = str(user_id)  # user_id를 namespace로 사용
         index.delete(delete_all=True, namespace=namespace)  # delete_all 플래그 설정
+        keyword_index.delete_namespace(namespace)  # 하이브리드 검색용 키워드 역색인도 삭제
 
         return {
             "status": "success",
@@ -93,13 +95,14 @@ def generate_summary_and_pdf(request, user_id, topics):
         index_name = os.getenv("PINECONE_INDEX_NAME", "teamf")
 
         summaries = []
-        for topic in topics:
-            user_data = get_user_data_by_topic(instance, index_name, user_id, topic)
+        topic_embeddings = get_embeddings(topics, call_site="summary_retrieval", user_id=user_id)  # 모든 토픽의 벡터를 한 번의 요청으로 생성
+        for topic, topic_embedding in zip(topics, topic_embeddings):
+            user_data = get_user_data_by_topic(instance, index_name, user_id, topic, topic_embedding=topic_embedding)
             if not user_data:
                 continue
 
             combined_text = "\n".join([data["original_text"] for data in user_data])
-            summary_result = summarize_text_with_gpt(combined_text)
+            summary_result = summarize_text_with_gpt(combined_text, user_id=user_id)
 
             # JSON에서 "response" 키의 값만 사용
             if summary_result and summary_result.get("success"):
@@ -122,18 +125,13 @@ def generate_summary_for_topic(user_id, topic):
     특정 토픽에 대해 Pinecone 데이터를 가져오고 요약 생성
     """
     try:
-        # Pinecone 인스턴스 및 인덱스 가져오기
-        instance = get_pinecone_instance()
-        index_name = os.getenv("PINECONE_INDEX_NAME", "teamf")
-
-        # Pinecone에서 토픽 관련 데이터 가져오기
-        user_data = get_user_data_by_topic(instance, index_name, user_id, topic)
-        if not user_data:
+        # Pinecone에서 토픽 관련 데이터를 가져와 하나의 텍스트로 합치기
+        combined_text = get_topic_text(user_id, topic)
+        if not combined_text:
             return {"topic": topic, "status": "error", "message": "No data found for the topic."}
 
-        # 텍스트 합치기 및 요약 생성
-        combined_text = "\n".join([data["original_text"] for data in user_data])
-        summary_result = summarize_text_with_gpt(combined_text)
+        # 요약 생성
+        summary_result = summarize_text_with_gpt(combined_text, user_id=user_id)
 
         if summary_result and summary_result.get("success"):
             return {
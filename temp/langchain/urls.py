@@ -1,8 +1,9 @@
 from django.urls import path
-from .views import SummaryAPIView, DeleteUserDataView, DeleteSummaryView
+from .views import SummaryAPIView, SummaryStreamAPIView, DeleteUserDataView, DeleteSummaryView
 
 urlpatterns = [
     path('summary', SummaryAPIView.as_view(), name='summary'),
+    path('summary/stream', SummaryStreamAPIView.as_view(), name='summary-stream'),
     path("delete", DeleteUserDataView.as_view(), name="delete_user_data"),
     path("summary/<int:summary_id>/delete", DeleteSummaryView.as_view(), name="delete-summary"),
 
@@ -1,3 +1,4 @@
+import json
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
@@ -7,10 +8,12 @@ from .tasks import delete_user_data_from_pinecone, generate_summary_and_pdf, gen
 from .utils import text_to_pdf
 from user.models import UserSummary
 from rest_framework.permissions import IsAuthenticated
-from django.http import FileResponse, Http404
+from django.http import FileResponse, Http404, StreamingHttpResponse
 from temp.pinecone.models import PineconeSummary
 from celery import group
 from .utils import generate_pdf_from_summaries
+from .services import get_topic_text
+from temp.openaiService import get_embeddings, stream_summary
 
 
 class SummaryAPIView(APIView):
@@ -79,6 +82,101 @@ class SummaryAPIView(APIView):
         except Exception as e:
             return Response({"status": "error", "message": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+def sse_event(event, data):
+    """
+    Server-Sent Events 형식의 이벤트 문자열 생성
+    """
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+class SummaryStreamAPIView(APIView):
+    """
+    주제별 요약을 생성되는 대로 SSE로 스트리밍하고, 마지막에 PDF URL 전송
+    """
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_description=(
+            "주제별 요약을 Server-Sent Events(text/event-stream)로 스트리밍하는 API\n"
+            "이벤트 순서: topic_start -> token(여러 번) -> topic_end (주제마다 반복) -> done\n"
+            "- topic_start: {\"topic\"}\n"
+            "- token: {\"topic\", \"text\"} 요약 텍스트 조각\n"
+            "- topic_end: {\"topic\", \"status\", \"message\"(실패 시)}\n"
+            "- done: {\"status\", \"pdf_url\"} 또는 {\"status\": \"error\", \"message\"}"
+        ),
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                "topics": openapi.Schema(
+                    type=openapi.TYPE_ARRAY,
+                    items=openapi.Items(type=openapi.TYPE_STRING),
+                    description="List of topics to generate summaries for (e.g., ['AI', 'Machine Learning']).",
+                )
+            },
+            required=["topics"],
+        ),
+        responses={
+            200: openapi.Response(description="text/event-stream of summary events."),
+            400: openapi.Response(description="Bad Request. Missing or invalid input."),
+        }
+    )
+    def post(self, request):
+        user_id = request.user.id
+        topics = request.data.get("topics")
+
+        if not topics or not isinstance(topics, list):
+            return Response({"error": "Topics are required and must be a list."}, status=status.HTTP_400_BAD_REQUEST)
+
+        response = StreamingHttpResponse(
+            self.stream_summaries(request, user_id, topics),
+            content_type="text/event-stream",
+        )
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"  # 프록시(nginx) 버퍼링 비활성화
+        return response
+
+    def stream_summaries(self, request, user_id, topics):
+        try:
+            # 모든 토픽의 벡터를 한 번의 요청으로 생성
+            topic_embeddings = get_embeddings(topics, call_site="summary_retrieval", user_id=user_id)
+        except Exception as e:
+            yield sse_event("done", {"status": "error", "message": str(e)})
+            return
+
+        summaries = []
+        for topic, topic_embedding in zip(topics, topic_embeddings):
+            yield sse_event("topic_start", {"topic": topic})
+            try:
+                combined_text = get_topic_text(user_id, topic, topic_embedding=topic_embedding)
+                if not combined_text:
+                    yield sse_event("topic_end", {"topic": topic, "status": "error", "message": "No data found for the topic."})
+                    continue
+
+                # OpenAI 스트리밍 응답을 받는 대로 전달
+                parts = []
+                for text in stream_summary(combined_text, user_id=user_id):
+                    parts.append(text)
+                    yield sse_event("token", {"topic": topic, "text": text})
+
+                summaries.append({"topic": topic, "status": "success", "summary_text": "".join(parts)})
+                yield sse_event("topic_end", {"topic": topic, "status": "success"})
+
+            except Exception as e:
+                yield sse_event("topic_end", {"topic": topic, "status": "error", "message": str(e)})
+
+        if not summaries:
+            yield sse_event("done", {"status": "error", "message": "No summaries generated."})
+            return
+
+        try:
+            # PDF 생성
+            pdf_path = generate_pdf_from_summaries(user_id, summaries)
+            pdf_url = request.build_absolute_uri(f"/{pdf_path}")
+            yield sse_event("done", {"status": "success", "pdf_url": pdf_url})
+        except Exception as e:
+            yield sse_event("done", {"status": "error", "message": str(e)})
+
+
 class DeleteUserDataView(APIView):
     """
     현재 사용자의 Pinecone 데이터를 삭제하는 API
@@ -0,0 +1,117 @@
+import json
+import re
+from django.core.management.base import BaseCommand
+from config.settings import redis_client
+from temp import keyword_index
+from temp.pdf.models import UploadedPDF
+from temp.pdf.storage import META_FIELD, get_meta, pending_files_key, store_document
+
+# 이전 형식의 키 ({kind}:{file_id}:meta, pdf:{file_id}:page:{n}, text:{file_id}:line:{n})
+LEGACY_KEY_PATTERN = re.compile(r"^(pdf|text):([^:]+):(meta|page|line)(?::(\d+))?$")
+# 현재 형식의 문서 해시 키 ({kind}:{file_id})
+DOCUMENT_KEY_PATTERN = re.compile(r"^pdf:([^:]+)$")
+
+
+class Command(BaseCommand):
+    # 키워드 역색인(bm25:*)은 이전 형식 항목의 metadata(원문 사본)만 제거함
+    # 하이브리드 검색 도입 전에 업로드된 페이지는 원문이 Pinecone에만 있어 역색인에 추가하지 않음 (다시 업로드하면 색인)
+    help = "Redis 문서를 해시 형식으로 변환하고 사용자별 업로드 대기 파일 인덱스를 다시 만들며, 키워드 역색인의 원문 사본을 제거합니다 (SCAN 사용)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="SCAN 한 번에 가져올 키 수")
+        parser.add_argument("--dry-run", action="store_true", help="변경하지 않고 대상만 출력")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        dry_run = options["dry_run"]
+
+        migrated = self.migrate_legacy_keys(batch_size, dry_run)
+        indexed = self.rebuild_pending_index(batch_size, dry_run)
+        compacted = 0 if dry_run else keyword_index.compact_documents(batch_size)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"이전 형식 문서 {migrated}개 변환, 업로드 대기 파일 {indexed}개 인덱싱, 키워드 역색인 항목 {compacted}개 압축"
+        ))
+
+    def migrate_legacy_keys(self, batch_size, dry_run):
+        """
+        문서별 개별 키를 문서 해시 하나로 합치고 이전 키 삭제
+        """
+        legacy_documents = {}
+        for pattern in ("pdf:*:*", "text:*:*"):
+            for raw_key in redis_client.scan_iter(match=pattern, count=batch_size):
+                key = raw_key.decode("utf-8")
+                match = LEGACY_KEY_PATTERN.match(key)
+                if match:
+                    kind, file_id = match.group(1), match.group(2)
+                    legacy_documents.setdefault((kind, file_id), []).append(key)
+
+        for (kind, file_id), keys in legacy_documents.items():
+            self.stdout.write(f"변환: {kind}:{file_id} ({len(keys)}개 키)")
+            if dry_run:
+                continue
+
+            meta = {}
+            pages = {}
+            for key, raw in zip(keys, redis_client.mget(keys)):
+                if raw is None:
+                    continue
+                match = LEGACY_KEY_PATTERN.match(key)
+                if match.group(3) == META_FIELD:
+                    meta = json.loads(raw)
+                else:
+                    pages[int(match.group(4))] = json.loads(raw)
+
+            if kind == "pdf" and "user_id" not in meta:
+                meta["user_id"] = self.owner_of(file_id)
+
+            store_document(file_id, meta, pages, kind=kind)
+            redis_client.delete(*keys)
+
+        return len(legacy_documents)
+
+    def rebuild_pending_index(self, batch_size, dry_run):
+        """
+        현재 저장된 PDF 문서 해시를 기준으로 사용자별 업로드 대기 파일 집합을 다시 만듦
+        """
+        pending = {}
+        for raw_key in redis_client.scan_iter(match="pdf:*", count=batch_size):
+            match = DOCUMENT_KEY_PATTERN.match(raw_key.decode("utf-8"))
+            if not match:
+                continue
+
+            file_id = match.group(1)
+            meta = get_meta(file_id) or {}
+
+            # 아직 추출 중인 문서(저장된 페이지 수 < total_pages)는 추출이 끝나면 인덱스에 추가되므로 제외
+            if redis_client.hlen(raw_key) - 1 < int(meta.get("total_pages") or 0):
+                self.stdout.write(f"추출 중이므로 제외: pdf:{file_id}")
+                continue
+            user_id = meta.get("user_id")
+            if user_id is None:
+                user_id = self.owner_of(file_id)
+                if user_id is None:
+                    self.stdout.write(self.style.WARNING(f"소유자를 찾을 수 없음: pdf:{file_id}"))
+                    continue
+                if not dry_run:
+                    # 이후 삭제 시 인덱스에서 제거할 수 있도록 meta에도 기록
+                    meta["user_id"] = user_id
+                    redis_client.hset(raw_key, META_FIELD, json.dumps(meta, ensure_ascii=False))
+
+            pending.setdefault(user_id, set()).add(file_id)
+
+        if not dry_run:
+            pipe = redis_client.pipeline()
+            for raw_key in redis_client.scan_iter(match=pending_files_key("*"), count=batch_size):
+                pipe.delete(raw_key)
+            for user_id, file_ids in pending.items():
+                pipe.sadd(pending_files_key(user_id), *file_ids)
+            pipe.execute()
+
+        return sum(len(file_ids) for file_ids in pending.values())
+
+    @staticmethod
+    def owner_of(file_id):
+        if not str(file_id).isdigit():
+            return None
+        return UploadedPDF.objects.filter(id=file_id).values_list("user_id", flat=True).first()
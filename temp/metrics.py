@@ -0,0 +1,126 @@
+import logging
+import time
+from prometheus_client import Counter, Histogram
+from config.settings import redis_client
+
+logger = logging.getLogger(__name__)
+
+# OpenAI 호출 관련 Prometheus 지표 (django_prometheus의 /metrics 엔드포인트로 함께 노출)
+#   call_site: 호출 위치 (question_create, grading, explanation, summary, ingest 등)
+#   model    : 요청한 모델
+#   outcome  : success, error, unparsable (응답을 받았지만 변환 실패), cache_hit, cancelled
+
+OPENAI_CONTINUATION_CALLS = Counter(
+    "openai_continuation_calls_total",
+    "이어받기 응답 요청 수 (outcome: complete, round_limit, token_limit)",
+    ["outcome"],
+)
+
+OPENAI_CONTINUATION_ROUNDS = Counter(
+    "openai_continuation_rounds_total",
+    "finish_reason == length 로 인해 추가로 보낸 이어받기 요청 수",
+)
+
+OPENAI_REQUEST_LATENCY = Histogram(
+    "openai_request_latency_seconds",
+    "OpenAI API 요청 하나의 소요 시간",
+    ["call_site", "model", "outcome"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80, 160),
+)
+
+OPENAI_TOKENS = Counter(
+    "openai_tokens_total",
+    "OpenAI API 사용 토큰 수 (kind: prompt, completion, outcome: 실패/취소된 요청에 쓴 토큰 구분)",
+    ["call_site", "model", "kind", "outcome"],
+)
+
+# 사용자별 누적 사용량 (Redis 해시)
+#   usage:user:{user_id} -> requests, prompt_tokens, completion_tokens,
+#                           {call_site}:requests, {call_site}:prompt_tokens, {call_site}:completion_tokens
+USAGE_FIELDS = ("requests", "prompt_tokens", "completion_tokens")
+
+
+def user_usage_key(user_id):
+    return f"usage:user:{user_id}"
+
+
+def record_user_usage(user_id, call_site, prompt_tokens, completion_tokens):
+    """
+    사용자별 누적 요청 수와 토큰 수를 Redis에 기록 (Redis 오류는 로그만 남김)
+    """
+    if user_id is None:
+        return
+
+    values = {"requests": 1, "prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens}
+    try:
+        pipe = redis_client.pipeline()
+        for field, value in values.items():
+            pipe.hincrby(user_usage_key(user_id), field, value)
+            pipe.hincrby(user_usage_key(user_id), f"{call_site}:{field}", value)
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"Failed to record usage for user {user_id}: {str(e)}")
+
+
+def get_user_usage(user_id):
+    """
+    사용자별 누적 사용량 조회
+    Returns:
+        dict: {"total": {requests, prompt_tokens, completion_tokens}, "call_sites": {call_site: {...}}}
+    """
+    raw = redis_client.hgetall(user_usage_key(user_id))
+
+    usage = {"total": {field: 0 for field in USAGE_FIELDS}, "call_sites": {}}
+    for raw_field, raw_value in raw.items():
+        field = raw_field.decode("utf-8")
+        value = int(raw_value)
+        if ":" in field:
+            call_site, name = field.rsplit(":", 1)
+            usage["call_sites"].setdefault(call_site, {name: 0 for name in USAGE_FIELDS})[name] = value
+        else:
+            usage["total"][field] = value
+    return usage
+
+
+class track_openai_call:
+    """
+    OpenAI API 요청 하나의 소요 시간, 토큰 수, 결과를 기록하는 컨텍스트 매니저
+    예외가 발생하면 outcome을 error로 기록하고 예외는 그대로 전달 (호출자가 이미 outcome을 바꿨으면 유지)
+
+    사용 예:
+        with track_openai_call("grading", model, user_id) as call:
+            response = openai.ChatCompletion.create(...)
+            call.add_usage(response.get("usage"))
+    """
+
+    def __init__(self, call_site, model, user_id=None):
+        self.call_site = call_site
+        self.model = model
+        self.user_id = user_id
+        self.outcome = "success"
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def add_usage(self, usage):
+        """
+        API 응답의 usage 항목(prompt_tokens, completion_tokens)을 누적
+        """
+        if usage:
+            self.prompt_tokens += usage.get("prompt_tokens", 0) or 0
+            self.completion_tokens += usage.get("completion_tokens", 0) or 0
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is GeneratorExit:
+            self.outcome = "cancelled"  # 스트리밍 중 클라이언트 연결 종료
+        elif exc_type is not None and self.outcome == "success":
+            self.outcome = "error"
+
+        OPENAI_REQUEST_LATENCY.labels(self.call_site, self.model, self.outcome).observe(time.perf_counter() - self.started)
+        OPENAI_TOKENS.labels(self.call_site, self.model, "prompt", self.outcome).inc(self.prompt_tokens)
+        OPENAI_TOKENS.labels(self.call_site, self.model, "completion", self.outcome).inc(self.completion_tokens)
+        record_user_usage(self.user_id, self.call_site, self.prompt_tokens, self.completion_tokens)
+        return False
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.5 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('temp', '0002_morequestion_is_answer_question_is_answer'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadedpdf',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='uploadedpdf',
+            name='total_pages',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
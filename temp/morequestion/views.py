@@ -2,14 +2,16 @@ import os
 from rest_framework.response import Response
 from rest_framework.utils import json
 from rest_framework.views import APIView
-from temp.openaiService import ask_openai, get_embedding  # OpenAI API 호출 함수
+from temp.openaiService import ask_openai_routed, parse_json_array, parse_true_false  # OpenAI API 호출 함수
 from .models import MoreQuestion, MoreUserAnswer
 from temp.question.models import Question
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from .serializer import WrongAnswerSerializer, AllQuestionsSerializer
 from temp.pinecone.service import get_pinecone_instance, get_pinecone_index
+from django.conf import settings
 from drf_yasg.utils import swagger_auto_schema
+from temp.rag import build_context, retrieve_topic_matches
 from drf_yasg import openapi
 import json
 
@@ -62,20 +64,11 @@ class RegenerateQuestionsAPIView(APIView):
             pinecone_instance = get_pinecone_instance()
             pinecone_index = get_pinecone_index(pinecone_instance, os.getenv("PINECONE_INDEX_NAME"))
 
-            # 주제를 기반으로 Pinecone에서 연관 데이터 검색
-            related_contexts = []
-            for topic in topics:
-                query_result = pinecone_index.query(
-                    namespace=str(request.user.id),
-                    top_k=10,
-                    include_metadata=True,
-                    vector=get_embedding(topic),
-                )
-                for match in query_result.get("matches", []):
-                    related_contexts.append(match["metadata"].get("original_text", ""))
+            # 모든 토픽을 한 번에 임베딩하고 토픽별 검색을 동시에 수행
+            matches_by_topic, _ = retrieve_topic_matches(pinecone_index, request.user.id, topics)
 
-            # 연관 데이터를 하나의 컨텍스트로 결합
-            related_context = "\n".join([ctx.strip() for ctx in related_contexts if ctx])
+            # 중복을 제거하고 토픽별로 토큰 예산을 나누어 하나의 컨텍스트로 결합
+            related_context = build_context(list(matches_by_topic.values()), settings.RAG_CONTEXT_TOKEN_BUDGET)
 
             # 객관식 문제 생성 프롬프트 작성
             multiple_choice_prompt = (
@@ -96,8 +89,12 @@ class RegenerateQuestionsAPIView(APIView):
                 f"관련 텍스트: {related_context}\n"
             )
 
-            multiple_choice_result = ask_openai(multiple_choice_prompt, max_tokens=4096)
-            multiple_choices = json.loads(multiple_choice_result['response'])
+            multiple_choice_result = ask_openai_routed("question_generation", multiple_choice_prompt, parse=parse_json_array, call_site="question_regenerate", user_id=request.user.id)
+            if not multiple_choice_result.get("success"):
+                # 재시도 후에도 OpenAI 호출이 실패했거나 응답 형식이 잘못된 경우
+                return Response({"error": f"Failed to generate questions: {multiple_choice_result.get('error')}"},
+                                status=status.HTTP_503_SERVICE_UNAVAILABLE)
+            multiple_choices = multiple_choice_result["parsed"]
 
             # 생성된 객관식 문제 저장
             for multiple_choice_data in multiple_choices:
@@ -201,8 +198,8 @@ class SubmitAnswerAPIView(APIView):
                 )
 
                 # OpenAI API 호출
-                grading_result = ask_openai(grading_prompt, max_tokens=100)
-                is_correct = grading_result.get("response", "").strip().lower() == "true"
+                grading_result = ask_openai_routed("grading", grading_prompt, parse=parse_true_false, cache=True, user_id=request.user.id)
+                is_correct = grading_result.get("parsed") is True
 
 
             else:
@@ -221,7 +218,7 @@ class SubmitAnswerAPIView(APIView):
                     "이 문제의 해설을 자세히 설명해주세요. 가능한 경우, 문제의 배경이나 풀이 방법을 포함해주세요."
                 )
                 # OpenAI API 호출하여 해설 받기
-                explanation_result = ask_openai(explanation_prompt, max_tokens=1024)
+                explanation_result = ask_openai_routed("explanation", explanation_prompt, cache=True, user_id=request.user.id)
                 explanation = explanation_result.get("response", "해설을 생성할 수 없습니다.")
 
             # 사용자 답안 저장
@@ -374,7 +371,7 @@ class ConfusedAnswerView(APIView):
             )
 
             # OpenAI API 호출로 해설 생성
-            explanation_result = ask_openai(explanation_prompt, max_tokens=1024)
+            explanation_result = ask_openai_routed("explanation", explanation_prompt, cache=True, user_id=request.user.id)
             explanation = explanation_result.get("response", "해설을 생성할 수 없습니다.")
 
             # 해설 저장
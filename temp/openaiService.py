@@ -1,7 +1,21 @@
 import openai
 import os
+import queue
+import threading
+import hashlib
+import json
+import math
+import unicodedata
+from array import array
+from django.conf import settings
 from dotenv import load_dotenv
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from temp.cache import RedisLRUCache
+from temp.openai_backend import get_openai_backend
+from temp.resilience import call_with_retry
+from temp.chunker import chunk_text, context_window, count_tokens, normalize_text
+from temp.metrics import OPENAI_CONTINUATION_CALLS, OPENAI_CONTINUATION_ROUNDS, track_openai_call
 
 # .env 파일 로드
 load_dotenv()
@@ -9,187 +23,666 @@ load_dotenv()
 # OpenAI API 키 설정
 openai.api_key = os.getenv("OpenAI_API_Key")
 
-def get_embedding(text, model="text-embedding-ada-002"):
+logger = logging.getLogger(__name__)
+
+# 임베딩 요청 한 번에 담을 수 있는 입력 수와 토큰 수 제한
+EMBEDDING_MAX_INPUT_TOKENS = 8191  # 입력 하나당 최대 토큰 수 (text-embedding-ada-002)
+EMBEDDING_BATCH_MAX_INPUTS = 2048  # 요청 하나당 최대 입력 수
+EMBEDDING_BATCH_MAX_TOKENS = 250000  # 요청 하나당 토큰 합계 상한 (API 제한 300,000에서 여유를 둠)
+
+# 임베딩 캐시 (모델 + 정규화 텍스트 해시 -> float32 벡터)
+embedding_cache = RedisLRUCache(
+    "embedding",
+    max_entries=settings.EMBEDDING_CACHE_MAX_ENTRIES,
+    ttl=settings.EMBEDDING_CACHE_TTL,
+) if settings.EMBEDDING_CACHE_ENABLED else None
+
+# 응답 캐시 (모델 + temperature + max_tokens + 프롬프트 해시 -> 응답 텍스트), ask_openai(cache=True) 호출만 사용
+response_cache = RedisLRUCache(
+    "llm_response",
+    max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+    ttl=settings.LLM_CACHE_TTL,
+) if settings.LLM_CACHE_ENABLED else None
+
+SYSTEM_PROMPT = "You are a helpful assistant."
+
+
+def _prepare_embedding_input(text, model):
     """
-    OpenAI 임베딩을 생성하는 함수
+    임베딩 입력 검증 후 최대 토큰 수 이하의 조각 목록으로 나누기 (대부분의 입력은 조각 하나)
+    """
+    # text가 문자열인지 확인
+    if not isinstance(text, str):
+        raise ValueError(f"Expected 'text' to be a string, but got {type(text).__name__}")
+
+    # 텍스트가 비어있거나 None인 경우 예외 처리
+    if not text.strip():
+        raise ValueError("Text for embedding cannot be empty or null.")
+
+    # 텍스트가 너무 길면 버리지 않고 문장/문단 경계에서 나눔 (조각별 임베딩은 _combine_embeddings로 합침)
+    if count_tokens(text, model) <= EMBEDDING_MAX_INPUT_TOKENS:
+        return [text]
+    return chunk_text(text, max_tokens=EMBEDDING_MAX_INPUT_TOKENS, model=model)
+
+
+def _combine_embeddings(vectors, pieces, model):
+    """
+    긴 입력을 나눈 조각들의 임베딩을 토큰 수 가중 평균한 뒤 단위 벡터로 정규화해 하나로 합침
+    """
+    if len(vectors) == 1:
+        return vectors[0]
+
+    weights = [count_tokens(piece, model) for piece in pieces]
+    total = sum(weights)
+    combined = [sum(weight * value for weight, value in zip(weights, values)) / total for values in zip(*vectors)]
+    norm = math.sqrt(sum(value * value for value in combined))
+    return [value / norm for value in combined] if norm else combined
+
+
+def _split_embedding_batches(texts, model):
+    """
+    입력 수와 토큰 합계 제한을 넘지 않도록 (시작 위치, 입력 목록) 배치로 나눔
+    """
+    batches = []
+    start = 0
+    current = []
+    current_tokens = 0
+
+    for position, text in enumerate(texts):
+        tokens = count_tokens(text, model)
+        if current and (len(current) >= EMBEDDING_BATCH_MAX_INPUTS or current_tokens + tokens > EMBEDDING_BATCH_MAX_TOKENS):
+            batches.append((start, current))
+            start = position
+            current = []
+            current_tokens = 0
+        current.append(text)
+        current_tokens += tokens
+
+    if current:
+        batches.append((start, current))
+    return batches
+
+
+def _request_timeout(request_timeout, remaining):
+    """
+    요청 하나의 제한 시간과 마감까지 남은 시간 중 짧은 쪽
+    """
+    timeouts = [timeout for timeout in (request_timeout, remaining) if timeout]
+    return min(timeouts) if timeouts else None
+
+
+def _request_openai(method, call_site, model, user_id, deadline=None, request_timeout=None, validate=None, **request):
+    """
+    재시도/서킷 브레이커(temp/resilience.py)를 거쳐 OpenAI 백엔드를 호출하고, 시도마다 지연 시간과 토큰 사용량을 기록
+    Args:
+        method (str): "chat_completion" 또는 "embedding"
+        deadline (float): 재시도 포함 허용 시간 (기본값: settings.OPENAI_CALL_DEADLINE)
+        validate: 응답을 검사하는 함수. ValueError/TypeError를 내면 outcome을 unparsable로 기록하고 예외 전달 (재시도하지 않음)
+    """
+    def attempt(remaining):
+        with track_openai_call(call_site, model, user_id) as call:
+            response = getattr(get_openai_backend(), method)(
+                model=model,
+                request_timeout=_request_timeout(request_timeout, remaining),
+                **request,
+            )
+            call.add_usage(response.get("usage"))
+            if validate:
+                try:
+                    validate(response)
+                except (ValueError, TypeError):
+                    call.outcome = "unparsable"
+                    raise
+        return response
+
+    return call_with_retry("openai", attempt, deadline=deadline or settings.OPENAI_CALL_DEADLINE)
+
+
+def _embed_batch(batch, model, call_site, user_id):
+    """
+    배치 하나를 임베딩. 입력 때문에 거부되면(InvalidRequestError) 배치를 반으로 나누어 다시 요청해 문제 입력만 골라냄
+    인증 오류, 마감 시간 초과, 서킷 차단 등 입력과 무관한 오류는 나누어도 같은 결과이므로 바로 전달
     """
     try:
-        # text가 문자열인지 확인
-        if not isinstance(text, str):
-            raise ValueError(f"Expected 'text' to be a string, but got {type(text).__name__}")
-
-        # 텍스트가 비어있거나 None인 경우 예외 처리
-        if not text.strip():
-            raise ValueError("Text for embedding cannot be empty or null.")
-
-        # 텍스트 길이가 너무 긴 경우 자르기
-        max_tokens = 8191  # text-embedding-ada-002 모델의 최대 토큰 수 제한
-        if len(text) > max_tokens:
-            text = text[:max_tokens]
-
-        # OpenAI API 호출
-        response = openai.Embedding.create(
-            input=text,
-            model=model
-        )
+        response = _request_openai("embedding", call_site, model, user_id, input=batch)
+        # 응답 순서가 입력 순서와 다를 수 있으므로 index 기준으로 정렬
+        data = sorted(response["data"], key=lambda item: item["index"])
+        return [item["embedding"] for item in data]
+    except openai.error.InvalidRequestError as e:
+        logger.warning(f"Embedding batch rejected (size={len(batch)}): {str(e)}")
+        if len(batch) == 1:
+            raise
+
+    middle = len(batch) // 2
+    return _embed_batch(batch[:middle], model, call_site, user_id) + _embed_batch(batch[middle:], model, call_site, user_id)
+
+
+def embedding_cache_key(text, model):
+    """
+    모델과 정규화한 텍스트(유니코드 NFC, 연속 공백 축소)의 해시로 캐시 키 생성
+    """
+    normalized = unicodedata.normalize("NFC", " ".join(text.split()))
+    return hashlib.sha256(f"{model}\0{normalized}".encode("utf-8")).hexdigest()
+
+
+def encode_vector(vector):
+    return array("f", vector).tobytes()  # float32 바이트로 저장
+
+
+def decode_vector(raw):
+    vector = array("f")
+    vector.frombytes(raw)
+    return vector.tolist()
+
+
+def get_embeddings(texts, model="text-embedding-ada-002", call_site="embedding", user_id=None):
+    """
+    여러 텍스트의 OpenAI 임베딩을 배치 요청으로 생성하는 함수
+    캐시에 있는 텍스트는 요청하지 않고, 같은 텍스트가 여러 번 있으면 한 번만 요청
+    입력 최대 토큰 수를 넘는 텍스트는 조각으로 나누어 임베딩한 뒤 하나의 벡터로 합침
+    Args:
+        texts (list): 임베딩할 텍스트 목록
+        call_site (str), user_id: 사용량 지표에 기록할 호출 위치와 사용자
+    Returns:
+        list: 입력 순서와 같은 순서의 임베딩 벡터 목록
+    """
+    try:
+        # 입력별 조각 목록 (조각 단위로 캐시 조회와 배치 요청)
+        pieces_by_text = [_prepare_embedding_input(text, model) for text in texts]
+        inputs = [piece for pieces in pieces_by_text for piece in pieces]
+        keys = [embedding_cache_key(text, model) for text in inputs]
+
+        # 캐시 조회
+        embeddings = [None] * len(inputs)
+        if embedding_cache:
+            for position, raw in enumerate(embedding_cache.get_many(keys)):
+                if raw is not None:
+                    embeddings[position] = decode_vector(raw)
 
-        # 임베딩 벡터 반환
-        return response["data"][0]["embedding"]
+        # 캐시에 없는 텍스트만 중복 없이 모아서 요청
+        missing = {}
+        for position, key in enumerate(keys):
+            if embeddings[position] is None and key not in missing:
+                missing[key] = inputs[position]
+        missing_keys = list(missing)
+        missing_inputs = list(missing.values())
+
+        fetched = {}
+        for start, batch in _split_embedding_batches(missing_inputs, model):
+            for key, vector in zip(missing_keys[start:start + len(batch)], _embed_batch(batch, model, call_site, user_id)):
+                fetched[key] = vector
+
+        if embedding_cache:
+            embedding_cache.set_many({key: encode_vector(vector) for key, vector in fetched.items()})
+
+        vectors = iter([
+            embedding if embedding is not None else fetched[key]
+            for embedding, key in zip(embeddings, keys)
+        ])
+        return [
+            _combine_embeddings([next(vectors) for _ in pieces], pieces, model)
+            for pieces in pieces_by_text
+        ]
 
     except Exception as e:
         raise ValueError(f"Failed to generate embedding: {str(e)}")
 
-def ask_openai(prompt: str, model: str = "gpt-3.5-turbo", max_tokens: int = 2048, temperature: float = 0.7) -> dict:
+
+def get_embedding(text, model="text-embedding-ada-002", call_site="embedding", user_id=None):
+    """
+    OpenAI 임베딩을 생성하는 함수
+    """
+    return get_embeddings([text], model=model, call_site=call_site, user_id=user_id)[0]
+
+def response_cache_key(prompt, model, max_tokens, temperature):
+    """
+    모델, temperature, max_tokens, 프롬프트 해시로 응답 캐시 키 생성
+    """
+    payload = json.dumps([model, temperature, max_tokens, SYSTEM_PROMPT, prompt], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def ask_openai(
+    prompt: str,
+    model: str = "gpt-3.5-turbo",
+    max_tokens: int = 2048,
+    temperature: float = 0.7,
+    cache: bool = False,
+    call_site: str = "chat",
+    user_id=None,
+    request_timeout: float = None,
+    deadline: float = None,
+    parse=None,
+) -> dict:
     """
     OpenAI API와 통신하여 답변을 반환합니다.
+    Args:
+        cache (bool): True이면 같은 요청(모델, temperature, max_tokens, 프롬프트)의 이전 응답을 재사용합니다.
+            같은 입력에 같은 답을 돌려줘도 되는 호출(채점, 해설 등)에서만 사용하세요.
+        parse: 응답 텍스트를 변환하는 함수. 변환 결과는 "parsed"에 담기고, 변환에 실패하면 실패로 반환
+        call_site (str), user_id: 사용량 지표에 기록할 호출 위치와 사용자
+        request_timeout (float): 요청 하나의 제한 시간 (초)
+        deadline (float): 재시도를 포함한 전체 허용 시간 (초)
     """
+    cache_key = response_cache_key(prompt, model, max_tokens, temperature) if cache and response_cache else None
+    if cache_key:
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            result = {
+                "success": True,
+                "response": cached.decode("utf-8")
+            }
+            try:
+                if parse is not None:
+                    result["parsed"] = parse(result["response"])
+            except (ValueError, TypeError):
+                pass  # 변환할 수 없는 캐시 응답은 무시하고 새로 요청
+            else:
+                with track_openai_call(call_site, model, user_id) as call:
+                    call.outcome = "cache_hit"
+                return result
+
+    parsed = {}
+
+    def validate(response):
+        # 변환 실패를 요청 기록 안에서 판단해 토큰 지표에 unparsable로 남김
+        parsed["value"] = parse(response['choices'][0]['message']['content'])
+
     try:
-        response = openai.ChatCompletion.create(
-            model=model,
+        response = _request_openai(
+            "chat_completion",
+            call_site,
+            model,
+            user_id,
+            deadline=deadline,
+            request_timeout=request_timeout,
+            validate=validate if parse is not None else None,
             messages=[
-                {"role": "system", "content": "You are a helpful assistant."},
+                {"role": "system", "content": SYSTEM_PROMPT},
                 {"role": "user", "content": prompt},
             ],
             max_tokens=max_tokens,  # 요청 시 최대 토큰 동적으로 설정
             temperature=temperature,
         )
-        return {
+        content = response['choices'][0]['message']['content']
+
+        # 성공한(parse가 있으면 변환까지 성공한) 응답만 캐시에 저장
+        if cache_key:
+            response_cache.set(cache_key, content.encode("utf-8"))
+
+        result = {
             "success": True,
-            "response": response['choices'][0]['message']['content']
+            "response": content
         }
+        if parse is not None:
+            result["parsed"] = parsed["value"]
+        return result
     except Exception as e:
         return {
             "success": False,
             "error": str(e)
         }
-logger = logging.getLogger(__name__)
 
-def ask_openai_with_continue(prompt: str, model: str = "gpt-3.5-turbo", max_tokens: int = 2048, temperature: float = 0.7) -> dict:
+def parse_true_false(response_text):
+    """
+    채점 응답("True"/"False")을 bool로 변환 (다른 응답이면 ValueError)
+    """
+    answer = response_text.strip().strip(".\"'").lower()
+    if answer not in ("true", "false"):
+        raise ValueError(f"Expected True or False, got {response_text!r}")
+    return answer == "true"
+
+
+def parse_json_array(response_text):
     """
-    OpenAI API와 통신하여 끊긴 응답을 처리하고 이어받습니다.
+    JSON 배열 응답을 list로 변환 (JSON이 아니거나 배열이 아니면 ValueError)
     """
+    value = json.loads(response_text)
+    if not isinstance(value, list):
+        raise ValueError("API response is not a valid JSON array.")
+    return value
+
+
+def ask_openai_routed(route: str, prompt: str, parse=None, cache: bool = False, call_site: str = None, user_id=None) -> dict:
+    """
+    호출 종류(route)별로 settings.LLM_ROUTES에 설정된 모델, 최대 토큰 수, temperature, 타임아웃으로 ask_openai를 호출합니다.
+    요청이 실패하거나 parse가 응답을 변환하지 못하면 fallback_model이 설정된 경우 그 모델로 한 번 더 요청합니다.
+    Args:
+        route (str): 호출 종류 (grading, explanation, question_generation 등)
+        parse: 응답 텍스트를 변환하는 함수. 변환 결과는 "parsed"에 담김 (실패 시 None)
+        cache (bool): True이면 응답을 캐시에서 재사용 (parse가 성공한 응답만 캐시에 저장)
+        call_site (str): 사용량 지표에 기록할 호출 위치 (기본값: route)
+    """
+    config = settings.LLM_ROUTES[route]
+    models = [config["model"]]
+    if config.get("fallback_model"):
+        models.append(config["fallback_model"])
+
+    for model in models:
+        # parse를 ask_openai 안에서 실행: 변환 실패 응답은 캐시하지 않고 토큰은 outcome=unparsable로 기록
+        result = ask_openai(
+            prompt,
+            model=model,
+            max_tokens=config["max_tokens"],
+            temperature=config.get("temperature", 0.7),
+            cache=cache,
+            call_site=call_site or route,
+            user_id=user_id,
+            request_timeout=config.get("timeout"),
+            deadline=config.get("deadline"),
+            parse=parse,
+        )
+        if result.get("success"):
+            return result
+        logger.warning(f"LLM route {route} failed on {model}: {result.get('error')}")
+
+    if parse is not None:
+        result["parsed"] = None
+    return result
+
+
+CHAT_MESSAGE_OVERHEAD_TOKENS = 50  # 시스템 메시지 및 메시지 포맷 토큰 여유분
+CONTINUE_MAX_ROUNDS = 4  # 응답 하나당 최대 요청 횟수 (첫 요청 포함)
+CONTINUE_PROMPT = "Continue exactly where you stopped. Do not repeat anything you already wrote."
+
+
+def ask_openai_with_continue(
+    prompt: str,
+    model: str = "gpt-3.5-turbo",
+    max_tokens: int = 2048,
+    temperature: float = 0.7,
+    max_rounds: int = CONTINUE_MAX_ROUNDS,
+    max_total_tokens: int = None,
+    call_site: str = "chat",
+    user_id=None,
+) -> dict:
+    """
+    OpenAI API와 통신하여 끊긴 응답(finish_reason == "length")을 이어받습니다.
+    이어받을 때는 이전 대화(지금까지의 답변)를 함께 보내고, 요청 횟수와 전체 응답 토큰 수에 상한을 둡니다.
+    Args:
+        max_rounds (int): 최대 요청 횟수 (첫 요청 포함)
+        max_total_tokens (int): 모든 요청의 응답 토큰 합계 상한 (기본값: max_tokens * max_rounds)
+        call_site (str), user_id: 사용량 지표에 기록할 호출 위치와 사용자
+    """
+    if max_total_tokens is None:
+        max_total_tokens = max_tokens * max_rounds
+
     try:
-        response_text = ""
-        while True:
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt},
+        ]
+        response_parts = []
+        completion_tokens = 0
+        outcome = "round_limit"
+
+        for round_number in range(max_rounds):
+            # 남은 응답 토큰 예산과 컨텍스트 윈도우 안에서 이번 요청의 최대 토큰 수 결정
+            prompt_tokens = sum(count_tokens(message["content"], model) for message in messages) + CHAT_MESSAGE_OVERHEAD_TOKENS
+            round_max_tokens = min(
+                max_tokens,
+                max_total_tokens - completion_tokens,
+                context_window(model) - prompt_tokens,
+            )
+            if round_max_tokens <= 0:
+                outcome = "token_limit"
+                break
+
             # OpenAI API 호출
-            response = openai.ChatCompletion.create(
-                model=model,
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant."},
-                    {"role": "user", "content": prompt},
-                ],
-                max_tokens=max_tokens,
+            response = _request_openai(
+                "chat_completion",
+                call_site,
+                model,
+                user_id,
+                messages=messages,
+                max_tokens=round_max_tokens,
                 temperature=temperature,
             )
 
             # 응답에서 텍스트 추출
-            response_part = response['choices'][0]['message']['content']
-            response_text += response_part
-
-            # 디버깅 로그: 현재까지 생성된 텍스트 출력
-            print(f"[DEBUG] Current response part:\n{response_part}\n")
-            logger.debug(f"Current response part: {response_part}")
-
-            # 응답이 완결되었는지 확인
-            if response_part.strip().endswith(".") or len(response_part) < max_tokens:
-                # 응답이 끝났거나 토큰 제한에 도달하지 않은 경우 종료
-                print("[DEBUG] Response is complete.")
-                logger.debug("Response is complete.")
+            choice = response['choices'][0]
+            response_part = choice['message']['content']
+            response_parts.append(response_part)
+            completion_tokens += (response.get("usage") or {}).get("completion_tokens") or count_tokens(response_part, model)
+
+            logger.debug(f"Response round {round_number + 1}: finish_reason={choice.get('finish_reason')}")
+
+            # 토큰 제한으로 끊긴 경우에만 이어서 생성
+            if choice.get("finish_reason") != "length":
+                outcome = "complete"
                 break
-            else:
-                # 응답이 끊긴 경우 이어서 생성
-                prompt = "Continue."  # 모델에 이어서 응답 요청
-                print("[DEBUG] Sending 'Continue' prompt to OpenAI.")
-                logger.debug("Sending 'Continue' prompt to OpenAI.")
+
+            if round_number < max_rounds - 1:
+                # 이전 답변을 대화에 포함하여 끊긴 지점부터 이어서 요청
+                OPENAI_CONTINUATION_ROUNDS.inc()
+                messages = messages + [
+                    {"role": "assistant", "content": response_part},
+                    {"role": "user", "content": CONTINUE_PROMPT},
+                ]
+
+        OPENAI_CONTINUATION_CALLS.labels(outcome=outcome).inc()
+        if outcome != "complete":
+            logger.warning(f"Response truncated after {len(response_parts)} rounds ({outcome}, {completion_tokens} tokens)")
 
         return {
             "success": True,
-            "response": response_text.strip()
+            "response": "".join(response_parts).strip()
         }
     except Exception as e:
         # 예외 발생 시 로그 출력
-        print(f"[ERROR] {str(e)}")
-        logger.error(f"Error in ask_openai_with_continue: {str(e)}")
+        logger.exception(f"Error in ask_openai_with_continue: {str(e)}")
         return {
             "success": False,
             "error": str(e)
         }
 
-def split_text(text: str, max_tokens: int = 3000) -> list:
-    """
-    긴 텍스트를 지정된 토큰 수 이하로 분할합니다.
-    Args:
-        text (str): 입력 텍스트
-        max_tokens (int): 분할할 텍스트의 최대 토큰 수
-    Returns:
-        list: 분할된 텍스트 조각 리스트
-    """
-    sentences = text.split("\n")  # 문단 단위로 나눔
-    chunks = []
-    current_chunk = ""
-
-    for sentence in sentences:
-        # 현재 청크에 문장을 추가해도 max_tokens를 초과하지 않으면 추가
-        if len(current_chunk) + len(sentence) <= max_tokens:
-            current_chunk += sentence + "\n"
-        else:
-            # 현재 청크를 저장하고 새 청크 생성
-            chunks.append(current_chunk.strip())
-            current_chunk = sentence + "\n"
-
-    # 마지막 청크 추가
-    if current_chunk:
-        chunks.append(current_chunk.strip())
+SUMMARY_PROMPT = (
+    "다음 텍스트를 기반으로 주요 내용을 구조화하여 요약해 주세요. "
+    "요약 형식: "
+    "1) 각 주요 아이디어를 별도의 항목으로 정리합니다. "
+    "2) 항목당 1~2개의 간결한 문장을 사용하여 핵심 내용을 설명합니다. "
+    "3) 텍스트의 전반적인 주제를 먼저 간단히 요약한 후 세부 내용을 항목화하세요. "
+    "텍스트를 강조하기 위한 * 사용 금지"
+    "정리된 번호마다 /n로 간격 띄우기"
+    "텍스트: {chunk}"
+)
+SUMMARY_REDUCE_PROMPT = (
+    "다음은 한 문서를 부분별로 요약한 내용입니다. 중복을 합치고 원래 순서를 유지하여 하나의 구조화된 요약으로 정리해 주세요. "
+    "요약 형식: "
+    "1) 문서의 전반적인 주제를 먼저 간단히 요약한 후 세부 내용을 항목화하세요. "
+    "2) 항목당 1~2개의 간결한 문장을 사용하여 핵심 내용을 설명합니다. "
+    "텍스트를 강조하기 위한 * 사용 금지"
+    "정리된 번호마다 /n로 간격 띄우기"
+    "부분 요약: {chunk}"
+)
+SUMMARY_MODEL = "gpt-3.5-turbo"
+SUMMARY_MAX_REDUCE_LEVELS = 3  # 계층적 축소 최대 단계 수
+SUMMARY_RESPONSE_TOKENS = 1024  # 청크 요약 하나의 최대 응답 토큰 수
+SUMMARY_CHUNK_MAX_TOKENS = 4000  # 청크 하나의 최대 입력 토큰 수 (컨텍스트 윈도우가 더 작으면 그에 맞춤)
+SUMMARY_CHUNK_OVERLAP_TOKENS = 100  # 청크 사이에 겹치는 토큰 수 (경계에서 문맥 유지)
 
-    return chunks
 
-def preprocess_text(text: str) -> str:
+def summary_chunk_tokens(model=SUMMARY_MODEL):
     """
-    텍스트를 전처리하여 불필요한 공백이나 특수 문자를 제거합니다.
+    요약 프롬프트와 응답을 제외하고 컨텍스트 윈도우에 들어가는 청크 크기
     """
-    text = text.replace("\n", " ").strip()  # 공백 및 줄바꿈 제거
-    text = " ".join(text.split())  # 여러 공백을 하나로 축소
-    return text
+    available = (
+        context_window(model)
+        - SUMMARY_RESPONSE_TOKENS
+        - count_tokens(SUMMARY_PROMPT.format(chunk=""), model)
+        - CHAT_MESSAGE_OVERHEAD_TOKENS
+    )
+    return min(SUMMARY_CHUNK_MAX_TOKENS, available)
 
 
-def generate_summary(text: str) -> dict:
+def generate_summary(text: str, user_id=None, call_site: str = "summary") -> dict:
     """
-    긴 텍스트를 분할하여 요약을 생성하고, 끊긴 응답을 처리합니다.
+    긴 텍스트를 토큰 수 기준으로 분할하여 요약을 생성하고, 끊긴 응답을 처리합니다.
     """
     if not text.strip():
         return {"success": False, "error": "Input text is empty or null."}
 
-    # 텍스트 전처리
-    text = preprocess_text(text)
-
-    # 텍스트 분할
-    text_chunks = split_text(text, max_tokens=1500)
-    summaries = []
-
-    for chunk in text_chunks:
-        prompt = (
-            "다음 텍스트를 기반으로 주요 내용을 구조화하여 요약해 주세요. "
-            "요약 형식: "
-            "1) 각 주요 아이디어를 별도의 항목으로 정리합니다. "
-            "2) 항목당 1~2개의 간결한 문장을 사용하여 핵심 내용을 설명합니다. "
-            "3) 텍스트의 전반적인 주제를 먼저 간단히 요약한 후 세부 내용을 항목화하세요. "
-            "텍스트를 강조하기 위한 * 사용 금지"
-            "정리된 번호마다 /n로 간격 띄우기"
-            f"텍스트: {chunk}"
-        )
-        result = ask_openai_with_continue(prompt, max_tokens=1024)
-        if result.get("success"):
-            summaries.append(result["response"])
-        else:
-            summaries.append(f"Error processing chunk: {result.get('error')}")
+    # 텍스트 전처리 (문단/줄 구분은 분할 경계로 사용하기 위해 유지)
+    text = normalize_text(text)
+
+    # 문단/문장 경계 기준으로 토큰 수 이하로 분할
+    text_chunks = chunk_text(
+        text,
+        max_tokens=summary_chunk_tokens(),
+        overlap_tokens=SUMMARY_CHUNK_OVERLAP_TOKENS,
+        model=SUMMARY_MODEL,
+    )
+    # map: 청크별 요약을 병렬로 생성 (결과는 원문 순서 유지)
+    summaries = _summarize_parallel(SUMMARY_PROMPT, text_chunks, call_site, user_id)
+
+    # reduce: 합친 요약이 한 번의 요청에 들어가지 않으면 묶음별로 다시 요약 (계층적 축소)
+    for _ in range(SUMMARY_MAX_REDUCE_LEVELS):
+        combined = "\n\n".join(summaries)
+        if len(summaries) <= 1 or count_tokens(combined, SUMMARY_MODEL) <= summary_chunk_tokens():
+            break
+        groups = chunk_text(combined, max_tokens=summary_chunk_tokens(), model=SUMMARY_MODEL)
+        summaries = _summarize_parallel(SUMMARY_REDUCE_PROMPT, groups, call_site, user_id)
 
     final_summary = "\n\n".join(summaries)
     return {"success": True, "response": final_summary}
 
 
-def generate_problem(text: str) -> dict:
+def stream_openai(
+    prompt: str,
+    model: str = "gpt-3.5-turbo",
+    max_tokens: int = 2048,
+    temperature: float = 0.7,
+    call_site: str = "chat_stream",
+    user_id=None,
+):
+    """
+    OpenAI 스트리밍 모드로 답변을 생성하며 받은 텍스트 조각을 순서대로 yield 합니다.
+    스트리밍 응답에는 usage가 없으므로 토큰 수는 직접 계산하여 기록합니다.
+    """
+    with track_openai_call(call_site, model, user_id) as call:
+        # 스트림을 여는 요청만 재시도 (이미 받기 시작한 스트림은 재시도하지 않음)
+        response = call_with_retry("openai", lambda remaining: get_openai_backend().chat_completion(
+            model=model,
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt},
+            ],
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stream=True,
+            request_timeout=remaining,
+        ), deadline=settings.OPENAI_CALL_DEADLINE)
+        parts = []
+        try:
+            for chunk in response:
+                content = chunk["choices"][0].get("delta", {}).get("content")
+                if content:
+                    parts.append(content)
+                    yield content
+        finally:
+            # 소비자가 중간에 닫은 경우 남은 응답을 받지 않도록 업스트림 스트림도 닫음
+            close = getattr(response, "close", None)
+            if close:
+                close()
+            call.add_usage({
+                "prompt_tokens": count_tokens(SYSTEM_PROMPT, model) + count_tokens(prompt, model),
+                "completion_tokens": count_tokens("".join(parts), model),
+            })
+
+
+_STREAM_DONE = object()
+
+
+def stream_summary(text: str, user_id=None, call_site: str = "summary_stream"):
+    """
+    generate_summary의 스트리밍 버전: 청크별 요약을 병렬로 스트리밍 요청하고,
+    받은 텍스트 조각을 원문 순서대로 yield 합니다.
+    앞 청크를 내보내는 동안 뒤 청크는 버퍼에 쌓이므로 첫 내용은 모델 응답 한 번의 지연 후에 나옵니다.
+    스트리밍 중에는 계층적 축소를 하지 않습니다.
+    클라이언트 연결이 끊겨 제너레이터가 닫히면 진행 중인 청크 스트림을 모두 닫고 남은 청크는 요청하지 않습니다.
+    """
+    text = normalize_text(text)
+    if not text:
+        return
+
+    text_chunks = chunk_text(
+        text,
+        max_tokens=summary_chunk_tokens(),
+        overlap_tokens=SUMMARY_CHUNK_OVERLAP_TOKENS,
+        model=SUMMARY_MODEL,
+    )
+    buffers = [queue.Queue() for _ in text_chunks]
+    stop = threading.Event()  # 소비자가 닫히면 설정, 생산자는 조각마다 확인
+
+    def produce(chunk, buffer):
+        stream = None
+        try:
+            if stop.is_set():
+                return
+            stream = stream_openai(
+                SUMMARY_PROMPT.format(chunk=chunk),
+                model=SUMMARY_MODEL,
+                max_tokens=SUMMARY_RESPONSE_TOKENS,
+                call_site=call_site,
+                user_id=user_id,
+            )
+            for content in stream:
+                if stop.is_set():
+                    break
+                buffer.put(content)
+        except Exception as e:
+            buffer.put(f"Error processing chunk: {str(e)}")
+        finally:
+            if stream is not None:
+                stream.close()
+            buffer.put(_STREAM_DONE)
+
+    executor = ThreadPoolExecutor(max_workers=min(settings.SUMMARY_MAX_WORKERS, len(text_chunks)))
+    try:
+        for chunk, buffer in zip(text_chunks, buffers):
+            executor.submit(produce, chunk, buffer)
+
+        for index, buffer in enumerate(buffers):
+            if index > 0:
+                yield "\n\n"
+            while True:
+                content = buffer.get()
+                if content is _STREAM_DONE:
+                    break
+                yield content
+    finally:
+        # 클라이언트 연결 종료(GeneratorExit) 시 생산자 스트림이 끝나기를 기다리지 않음
+        stop.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _summarize_chunk(prompt_template, chunk, call_site, user_id):
+    result = ask_openai_with_continue(
+        prompt_template.format(chunk=chunk),
+        model=SUMMARY_MODEL,
+        max_tokens=SUMMARY_RESPONSE_TOKENS,
+        call_site=call_site,
+        user_id=user_id,
+    )
+    if result.get("success"):
+        return result["response"]
+    return f"Error processing chunk: {result.get('error')}"
+
+
+def _summarize_parallel(prompt_template, chunks, call_site, user_id):
+    """
+    청크들을 제한된 크기의 스레드 풀에서 동시에 요약하고, 입력 순서대로 반환
+    """
+    if len(chunks) <= 1:
+        return [_summarize_chunk(prompt_template, chunk, call_site, user_id) for chunk in chunks]
+
+    with ThreadPoolExecutor(max_workers=min(settings.SUMMARY_MAX_WORKERS, len(chunks))) as executor:
+        return list(executor.map(lambda chunk: _summarize_chunk(prompt_template, chunk, call_site, user_id), chunks))
+
+
+def generate_problem(text: str, user_id=None) -> dict:
     """
     텍스트 기반 문제를 생성합니다.
     """
     prompt = f"해당 텍스트 기반으로 문제를 만들어줘:\n\n{text}"
-    return ask_openai(prompt, max_tokens=500)
+    return ask_openai(prompt, max_tokens=500, call_site="problem", user_id=user_id)
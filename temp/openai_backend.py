@@ -0,0 +1,299 @@
+import hashlib
+import json
+import logging
+import math
+import os
+import random
+import re
+import threading
+import time
+import openai
+from django.conf import settings
+from temp.chunker import count_tokens
+
+logger = logging.getLogger(__name__)
+
+# openaiService가 OpenAI API를 호출할 때 사용하는 백엔드 (settings.OPENAI_BACKEND)
+#   openai : 실제 API 호출 (기본값)
+#   fake   : 네트워크 없이 결정적인 임베딩과 미리 정해둔 채팅 응답 반환 (지연 시간, 오류 비율 설정 가능)
+#   record : 실제 API를 호출하고 요청/응답을 OPENAI_RECORDINGS_DIR에 저장
+#   replay : 저장된 응답을 재생 (저장된 응답이 없으면 fake 응답)
+# 모든 백엔드는 openai.ChatCompletion.create / openai.Embedding.create와 같은 형태의 dict를 반환
+
+
+def request_key(kind, request):
+    """
+    요청 종류와 모델/입력/파라미터로 기록 파일 키 생성 (타임아웃 등 응답과 무관한 값은 제외)
+    """
+    payload = {
+        "kind": kind,
+        "model": request.get("model"),
+        "messages": request.get("messages"),
+        "input": request.get("input"),
+        "max_tokens": request.get("max_tokens"),
+        "temperature": request.get("temperature"),
+    }
+    return hashlib.sha256(json.dumps(payload, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _to_dict(response):
+    if hasattr(response, "to_dict_recursive"):
+        return response.to_dict_recursive()
+    return json.loads(json.dumps(response))
+
+
+class OpenAIBackend:
+    """
+    실제 OpenAI API 호출
+    """
+
+    def chat_completion(self, **request):
+        return openai.ChatCompletion.create(**request)
+
+    def embedding(self, **request):
+        return openai.Embedding.create(**request)
+
+
+class FakeBackend:
+    """
+    네트워크 없이 동작하는 OpenAI 대체 백엔드
+    - 임베딩: 입력 텍스트 해시를 시드로 만든 단위 벡터 (같은 텍스트 -> 같은 벡터)
+    - 채팅: 프롬프트 패턴별 응답 (OPENAI_FAKE_RESPONSES_FILE의 [{"pattern", "response"}] 규칙 우선)
+    - 요청마다 OPENAI_FAKE_LATENCY_MS(±JITTER) 만큼 지연, OPENAI_FAKE_ERROR_RATE 비율로 API 오류 발생
+    """
+
+    def __init__(self):
+        self.latency_ms = settings.OPENAI_FAKE_LATENCY_MS
+        self.jitter_ms = settings.OPENAI_FAKE_LATENCY_JITTER_MS
+        self.error_rate = settings.OPENAI_FAKE_ERROR_RATE
+        self.dimension = settings.OPENAI_FAKE_EMBEDDING_DIM
+        self.rules = self._load_rules(settings.OPENAI_FAKE_RESPONSES_FILE)
+
+    @staticmethod
+    def _load_rules(path):
+        if not path:
+            return []
+        with open(path, encoding="utf-8") as rules_file:
+            return [(re.compile(rule["pattern"], re.S), rule["response"]) for rule in json.load(rules_file)]
+
+    def _simulate(self):
+        """
+        설정된 지연 시간만큼 대기하고, 오류 비율에 따라 OpenAI 오류 발생
+        """
+        delay = max(0.0, random.gauss(self.latency_ms, self.jitter_ms)) / 1000
+        if delay:
+            time.sleep(delay)
+
+        if random.random() < self.error_rate:
+            error_class = random.choice([
+                openai.error.RateLimitError,
+                openai.error.ServiceUnavailableError,
+                openai.error.Timeout,
+                openai.error.APIError,
+            ])
+            raise error_class("Simulated OpenAI error (fake backend)")
+
+    def fake_embedding(self, text):
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+        generator = random.Random(seed)
+        vector = [generator.gauss(0, 1) for _ in range(self.dimension)]
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        return [value / norm for value in vector]
+
+    def fake_chat_content(self, prompt, max_tokens):
+        for pattern, response in self.rules:
+            if pattern.search(prompt):
+                return response
+
+        # 기본 규칙: 채점, 문제 생성(JSON 배열), 그 외 일반 텍스트
+        if "\"True\" 또는 \"False\"" in prompt:
+            return "True"
+        if "\"type\": \"객관식\"" in prompt:
+            return json.dumps([
+                {
+                    "type": "객관식",
+                    "topic": "테스트",
+                    "question": f"테스트 객관식 문제 {number}",
+                    "choices": ["선택지 1", "선택지 2", "선택지 3", "선택지 4", "선택지 5"],
+                    "answer": "선택지 1",
+                }
+                for number in range(1, 8)
+            ], ensure_ascii=False)
+        if "\"type\": \"주관식\"" in prompt:
+            return json.dumps([
+                {"type": "주관식", "topic": "테스트", "question": f"테스트 주관식 문제 {number}", "answer": "테스트 정답"}
+                for number in range(1, 4)
+            ], ensure_ascii=False)
+
+        sentence = "테스트 응답 문장입니다. "
+        repeat = max(1, min(max_tokens or 256, 256) // max(count_tokens(sentence), 1))
+        return (sentence * repeat).strip()
+
+    def chat_completion(self, **request):
+        self._simulate()
+
+        model = request.get("model")
+        prompt = "\n".join(message["content"] for message in request["messages"] if message["role"] == "user")
+        content = self.fake_chat_content(prompt, request.get("max_tokens"))
+        prompt_tokens = sum(count_tokens(message["content"], model) for message in request["messages"])
+        return self._chat_response(model, content, prompt_tokens, request.get("stream"))
+
+    def embedding(self, **request):
+        self._simulate()
+
+        inputs = request["input"] if isinstance(request["input"], list) else [request["input"]]
+        return {
+            "object": "list",
+            "model": request.get("model"),
+            "data": [
+                {"object": "embedding", "index": index, "embedding": self.fake_embedding(text)}
+                for index, text in enumerate(inputs)
+            ],
+            "usage": {
+                "prompt_tokens": sum(count_tokens(text) for text in inputs),
+                "total_tokens": sum(count_tokens(text) for text in inputs),
+            },
+        }
+
+    @staticmethod
+    def _chat_response(model, content, prompt_tokens, stream=False, finish_reason="stop"):
+        if stream:
+            return _stream_chunks(model, content)
+
+        completion_tokens = count_tokens(content, model)
+        return {
+            "object": "chat.completion",
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": finish_reason,
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+
+def _stream_chunks(model, content, piece_size=8):
+    """
+    스트리밍 응답 형태로 content를 조각내어 yield
+    """
+    for start in range(0, len(content), piece_size):
+        yield {"model": model, "choices": [{"index": 0, "delta": {"content": content[start:start + piece_size]}, "finish_reason": None}]}
+    yield {"model": model, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+
+
+class RecordingBackend(OpenAIBackend):
+    """
+    실제 API를 호출하고 요청/응답을 {OPENAI_RECORDINGS_DIR}/{kind}/{key}.json 으로 저장
+    """
+
+    def __init__(self):
+        self.directory = settings.OPENAI_RECORDINGS_DIR
+
+    def _save(self, kind, request, response, latency):
+        path = os.path.join(self.directory, kind, f"{request_key(kind, request)}.json")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        record = {
+            "request": {key: value for key, value in request.items() if key != "request_timeout"},
+            "response": response,
+            "latency": latency,
+        }
+        with open(path, "w", encoding="utf-8") as record_file:
+            json.dump(record, record_file, ensure_ascii=False)
+
+    def chat_completion(self, **request):
+        started = time.perf_counter()
+        response = super().chat_completion(**request)
+
+        if request.get("stream"):
+            return self._record_stream(request, response, started)
+
+        self._save("chat", request, _to_dict(response), time.perf_counter() - started)
+        return response
+
+    def _record_stream(self, request, response, started):
+        # 스트리밍 응답은 전체를 모은 뒤 일반 응답 형태로 저장
+        parts = []
+        for chunk in response:
+            content = chunk["choices"][0].get("delta", {}).get("content")
+            if content:
+                parts.append(content)
+            yield chunk
+
+        content = "".join(parts)
+        self._save("chat", request, FakeBackend._chat_response(request.get("model"), content, 0), time.perf_counter() - started)
+
+    def embedding(self, **request):
+        started = time.perf_counter()
+        response = super().embedding(**request)
+        self._save("embedding", request, _to_dict(response), time.perf_counter() - started)
+        return response
+
+
+class ReplayBackend(FakeBackend):
+    """
+    RecordingBackend가 저장한 응답을 재생 (없는 요청은 FakeBackend 응답)
+    OPENAI_REPLAY_LATENCY가 True이면 기록된 실제 지연 시간만큼 대기
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.directory = settings.OPENAI_RECORDINGS_DIR
+        self.replay_latency = settings.OPENAI_REPLAY_LATENCY
+
+    def _load(self, kind, request):
+        path = os.path.join(self.directory, kind, f"{request_key(kind, request)}.json")
+        if not os.path.exists(path):
+            logger.info(f"No recording for {kind} request, using fake response")
+            return None
+        with open(path, encoding="utf-8") as record_file:
+            record = json.load(record_file)
+        if self.replay_latency:
+            time.sleep(record.get("latency", 0))
+        return record["response"]
+
+    def chat_completion(self, **request):
+        record = self._load("chat", request)
+        if record is None:
+            return super().chat_completion(**request)
+
+        if request.get("stream"):
+            return _stream_chunks(request.get("model"), record["choices"][0]["message"]["content"])
+        return record
+
+    def embedding(self, **request):
+        record = self._load("embedding", request)
+        if record is None:
+            return super().embedding(**request)
+        return record
+
+
+BACKENDS = {
+    "openai": OpenAIBackend,
+    "fake": FakeBackend,
+    "record": RecordingBackend,
+    "replay": ReplayBackend,
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_openai_backend():
+    """
+    settings.OPENAI_BACKEND에 해당하는 백엔드를 프로세스별로 한 번만 생성해 반환
+    """
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            name = settings.OPENAI_BACKEND
+            if name not in BACKENDS:
+                raise ValueError(f"Unknown OPENAI_BACKEND: {name} (choose from {', '.join(BACKENDS)})")
+            _backend = BACKENDS[name]()
+            if name != "openai":
+                logger.warning(f"OpenAI backend: {name}")
+        return _backend
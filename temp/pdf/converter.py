@@ -0,0 +1,156 @@
+import atexit
+import logging
+import os
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# soffice 인스턴스에 변환 작업을 전달하는 헬퍼 스크립트 (시스템 python + uno로 실행)
+UNO_CONVERT_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "unoconvert.py")
+
+
+class LibreOfficeInstance:
+    """
+    상주하는 headless soffice 프로세스 하나
+    인스턴스마다 별도의 사용자 프로필 디렉터리와 로컬 파이프를 사용하므로 동시에 변환해도 충돌하지 않음
+    """
+
+    def __init__(self, slot):
+        self.slot = slot
+        self.pipe_name = f"soffice_{os.getpid()}_{slot}"
+        self.profile_dir = os.path.join(tempfile.gettempdir(), f"soffice_profile_{os.getpid()}_{slot}")
+        self.process = None
+        self.jobs_done = 0
+
+    def is_alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def start(self):
+        self.process = subprocess.Popen([
+            settings.LIBREOFFICE_BINARY,
+            "--headless",
+            "--invisible",
+            "--nologo",
+            "--norestore",
+            "--nodefault",
+            "--nolockcheck",
+            f"-env:UserInstallation=file://{self.profile_dir}",
+            f"--accept=pipe,name={self.pipe_name};urp;StarOffice.ComponentContext",
+        ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self.jobs_done = 0
+        logger.info(f"LibreOffice 인스턴스 시작: slot={self.slot}, pid={self.process.pid}")
+
+    def stop(self):
+        if self.is_alive():
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        self.process = None
+
+    def convert(self, input_path, output_path, timeout):
+        if not self.is_alive():
+            self.start()
+
+        subprocess.run([
+            settings.LIBREOFFICE_PYTHON,
+            UNO_CONVERT_SCRIPT,
+            "--pipe", self.pipe_name,
+            input_path,
+            output_path,
+        ], check=True, timeout=timeout, capture_output=True)
+        self.jobs_done += 1
+
+
+class LibreOfficePool:
+    """
+    미리 띄워둔 soffice 인스턴스 풀
+    변환 요청은 큐에서 빈 인스턴스를 받아 처리하고, 타임아웃/실패 시 또는 max_jobs회 변환 후 인스턴스를 재시작
+    """
+
+    def __init__(self, size, max_jobs, timeout):
+        self.pid = os.getpid()
+        self.max_jobs = max_jobs
+        self.timeout = timeout
+        self._instances = []
+        self._idle = queue.Queue()
+
+        for slot in range(size):
+            instance = LibreOfficeInstance(slot)
+            instance.start()  # 첫 변환부터 콜드 스타트가 없도록 미리 실행
+            self._instances.append(instance)
+            self._idle.put(instance)
+
+    def convert(self, input_path, output_path):
+        instance = self._idle.get()
+        try:
+            instance.convert(input_path, output_path, self.timeout)
+        except Exception:
+            # 멈췄거나 비정상 상태일 수 있는 인스턴스는 종료하고 다음 작업에서 새로 시작
+            instance.stop()
+            raise
+        finally:
+            # 장시간 사용으로 인한 메모리 증가를 막기 위해 일정 횟수마다 재시작
+            if instance.jobs_done >= self.max_jobs:
+                instance.stop()
+            self._idle.put(instance)
+
+        if not os.path.exists(output_path):
+            raise RuntimeError(f"LibreOffice 변환 결과가 없습니다: {output_path}")
+
+    def shutdown(self):
+        for instance in self._instances:
+            instance.stop()
+            shutil.rmtree(instance.profile_dir, ignore_errors=True)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_libreoffice_pool():
+    """
+    프로세스별 LibreOffice 풀을 반환 (fork된 자식 프로세스에서는 새로 생성)
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.pid != os.getpid():
+            _pool = LibreOfficePool(
+                size=settings.LIBREOFFICE_POOL_SIZE,
+                max_jobs=settings.LIBREOFFICE_MAX_JOBS,
+                timeout=settings.LIBREOFFICE_JOB_TIMEOUT,
+            )
+            atexit.register(_pool.shutdown)
+        return _pool
+
+
+def convert_with_libreoffice(input_path, output_path):
+    """
+    LibreOffice로 문서를 PDF로 변환
+    풀 크기가 0이면 작업마다 격리된 프로필로 soffice를 새로 실행 (기존 방식)
+    """
+    if settings.LIBREOFFICE_POOL_SIZE > 0:
+        get_libreoffice_pool().convert(input_path, output_path)
+        return
+
+    profile_dir = tempfile.mkdtemp(prefix="soffice_profile_")
+    try:
+        subprocess.run([
+            settings.LIBREOFFICE_BINARY,
+            "--headless",
+            f"-env:UserInstallation=file://{profile_dir}",
+            "--convert-to",
+            "pdf",
+            "--outdir",
+            os.path.dirname(output_path),
+            input_path
+        ], check=True, timeout=settings.LIBREOFFICE_JOB_TIMEOUT)
+    finally:
+        shutil.rmtree(profile_dir, ignore_errors=True)
@@ -0,0 +1,117 @@
+import logging
+import math
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import fitz
+from pymupdf4llm.helpers.pymupdf_rag import to_markdown, IdentifyHeaders
+
+# 워커 프로세스는 spawn 방식으로 생성되어 이 모듈만 다시 import 하므로
+# Django 설정이나 Redis 등 무거운 의존성은 이 모듈에서 import 하지 않음
+
+MAX_PAGES_PER_RANGE = 16  # 워커 하나가 한 번에 처리하는 최대 페이지 수
+
+logger = logging.getLogger(__name__)
+
+
+def convert_rect_objects(data):
+    """데이터 구조에서 Rect 객체를 재귀적으로 변환"""
+    if isinstance(data, dict):
+        # 딕셔너리 내부 Rect 변환
+        return {k: convert_rect_objects(v) for k, v in data.items()}
+    elif isinstance(data, list):
+        # 리스트 내부 Rect 변환
+        return [convert_rect_objects(item) for item in data]
+    elif isinstance(data, fitz.Rect):
+        # Rect 객체를 [x0, y0, x1, y1] 리스트로 변환
+        return [data.x0, data.y0, data.x1, data.y1]
+    else:
+        # Rect가 아닌 경우 그대로 반환
+        return data
+
+
+def iter_pdf_pages(pdf_path):
+    """
+    PDF를 한 페이지씩 마크다운으로 추출하여 (페이지 번호, 페이지 데이터)를 순서대로 yield
+    전체 문서를 메모리에 올리지 않으므로 페이지 수와 무관하게 메모리 사용량이 일정하게 유지됨
+    """
+    doc = fitz.open(pdf_path)
+    try:
+        # 헤더 판별용 폰트 크기 정보는 문서 전체 기준으로 한 번만 계산
+        hdr_info = IdentifyHeaders(doc)
+
+        for page_index in range(doc.page_count):
+            page_chunk = to_markdown(
+                doc,
+                pages=[page_index],
+                hdr_info=hdr_info,
+                page_chunks=True,
+                show_progress=False,
+            )[0]
+
+            # Rect 객체를 재귀적으로 변환
+            yield page_index + 1, convert_rect_objects(page_chunk)
+    finally:
+        doc.close()
+
+
+def _extract_page_range(pdf_path, start, end, hdr_info):
+    """
+    프로세스 풀 워커: 자체 fitz 문서를 열어 [start, end) 범위의 페이지를 추출
+    """
+    doc = fitz.open(pdf_path)
+    try:
+        page_chunks = to_markdown(
+            doc,
+            pages=list(range(start, end)),
+            hdr_info=hdr_info,
+            page_chunks=True,
+            show_progress=False,
+        )
+        return convert_rect_objects(page_chunks)
+    finally:
+        doc.close()
+
+
+def split_page_ranges(page_count, workers):
+    """
+    전체 페이지를 워커 수보다 잘게 [start, end) 범위로 분할 (워커 간 부하 분산용)
+    """
+    range_size = max(1, min(MAX_PAGES_PER_RANGE, math.ceil(page_count / (workers * 4))))
+    return [(start, min(start + range_size, page_count)) for start in range(0, page_count, range_size)]
+
+
+def iter_pdf_pages_parallel(pdf_path, workers):
+    """
+    PDF를 페이지 범위로 나누어 여러 프로세스에서 병렬 추출하고,
+    (페이지 번호, 페이지 데이터)를 페이지 순서대로 yield
+    """
+    # Celery prefork 워커처럼 데몬 프로세스에서는 자식 프로세스를 만들 수 없으므로 순차 추출
+    # (업로드 파일 처리 태스크는 CELERY_TASK_ROUTES로 스레드 풀 워커 큐에 보내 이 경로를 피함)
+    if multiprocessing.current_process().daemon:
+        logger.warning("PDF 병렬 추출 불가 (데몬 프로세스): pdf_ingest 큐를 -P threads 워커로 실행하세요")
+    if workers <= 1 or multiprocessing.current_process().daemon:
+        yield from iter_pdf_pages(pdf_path)
+        return
+
+    with fitz.open(pdf_path) as doc:
+        page_count = doc.page_count
+        # 헤더 판별 정보는 한 번만 계산해 모든 워커에 전달
+        hdr_info = IdentifyHeaders(doc)
+
+    page_ranges = split_page_ranges(page_count, workers)
+    if not page_ranges:
+        return
+
+    context = multiprocessing.get_context("spawn")
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(page_ranges)), mp_context=context) as executor:
+        futures = [
+            executor.submit(_extract_page_range, pdf_path, start, end, hdr_info)
+            for start, end in page_ranges
+        ]
+
+        # 제출 순서대로 결과를 기다려 페이지 순서를 유지
+        for (start, _), future in zip(page_ranges, futures):
+            for offset, page_chunk in enumerate(future.result()):
+                yield start + offset + 1, page_chunk
@@ -6,6 +6,8 @@ class UploadedPDF(models.Model):
     file_name = models.CharField(max_length=255)  # 사용자 친화적인 파일 이름 저장
     uploaded_at = models.DateTimeField(auto_now_add=True)  # 업로드 시간 기록
     user = models.ForeignKey(User, on_delete=models.CASCADE, default=1)  # 업로드한 사용자와 연결
+    content_hash = models.CharField(max_length=64, null=True, blank=True, db_index=True)  # 파일 내용 SHA-256 (중복 업로드 판별)
+    total_pages = models.PositiveIntegerField(null=True, blank=True)  # 추출 완료된 페이지 수 (추출 전에는 None)
 
     def __str__(self):
         return self.file_name
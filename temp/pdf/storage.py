@@ -0,0 +1,215 @@
+import json
+import zlib
+from config.settings import redis_client
+
+# 문서 하나를 Redis 해시 하나에 저장
+#   key   : {kind}:{file_id}            (kind: "pdf" 또는 "text")
+#   field : meta                        -> JSON (file_name, total_pages 등)
+#           page:{n}                    -> zlib 압축된 JSON (페이지 또는 줄 데이터)
+# 페이지 쓰기는 파이프라인으로 묶어서 전송
+#
+# KEYS 전체 검색 대신 사용하는 인덱스
+#   user:{user_id}:pending_files      -> Pinecone 업로드 대기 중인 사용자의 PDF file_id 집합
+#   ingest_job:{job_id}               -> 업로드 처리 작업의 소유자와 file_id (JSON, 상태 조회 권한 확인용)
+# meta에 user_id가 있으면 문서 전체가 저장된 뒤 인덱스에 추가하고 (store_document, copy_document, mark_pending),
+# 문서 삭제 시 제거
+
+META_FIELD = "meta"
+PAGE_WRITE_BATCH = 16  # 파이프라인 한 번에 저장할 페이지 수
+INGEST_JOB_TTL = 60 * 60 * 24  # 업로드 작업 소유자 기록 보관 시간 (Celery 결과 보관 기간과 동일)
+
+
+def document_key(file_id, kind="pdf"):
+    return f"{kind}:{file_id}"
+
+
+def page_field(page_number):
+    return f"page:{page_number}"
+
+
+def pending_files_key(user_id):
+    return f"user:{user_id}:pending_files"
+
+
+def _index_document(pipe, file_id, meta, kind):
+    if kind == "pdf" and meta.get("user_id") is not None:
+        pipe.sadd(pending_files_key(meta["user_id"]), file_id)
+
+
+def encode_page(data):
+    return zlib.compress(json.dumps(data, ensure_ascii=False).encode("utf-8"))
+
+
+def decode_page(raw):
+    return json.loads(zlib.decompress(raw).decode("utf-8"))
+
+
+def page_text(page_data):
+    """
+    페이지 데이터에서 본문 텍스트만 꺼냄 (pymupdf4llm 페이지 청크 또는 문자열)
+    """
+    text_field = page_data.get("text")
+    if isinstance(text_field, dict) and "text" in text_field:
+        return text_field["text"]
+    if isinstance(text_field, str):
+        return text_field
+    return None
+
+
+class PageWriter:
+    """
+    페이지를 모아 두었다가 PAGE_WRITE_BATCH개마다 파이프라인 한 번으로 저장
+    with 블록을 벗어나면 남은 페이지를 저장
+    """
+
+    def __init__(self, file_id, kind="pdf", batch_size=PAGE_WRITE_BATCH):
+        self.key = document_key(file_id, kind)
+        self.batch_size = batch_size
+        self._pending = {}
+
+    def add(self, page_number, data):
+        self._pending[page_field(page_number)] = encode_page(data)
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self._pending:
+            redis_client.hset(self.key, mapping=self._pending)
+            self._pending = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush()
+
+
+def store_meta(file_id, meta, kind="pdf"):
+    """
+    메타데이터만 저장 (업로드 대기 인덱스에는 추가하지 않음)
+    페이지를 나누어 저장하는 경우 모든 페이지를 저장한 뒤 mark_pending으로 인덱스에 추가해야
+    추출 중인 문서가 업로드 작업에 일부만 올라가거나 삭제되지 않음
+    """
+    redis_client.hset(document_key(file_id, kind), META_FIELD, json.dumps(meta, ensure_ascii=False))
+
+
+def mark_pending(file_id, meta, kind="pdf"):
+    """
+    모든 페이지 저장이 끝난 문서를 소유자의 업로드 대기 인덱스에 추가
+    """
+    pipe = redis_client.pipeline()
+    _index_document(pipe, file_id, meta, kind)
+    pipe.execute()
+
+
+def store_document(file_id, meta, pages, kind="pdf"):
+    """
+    메타데이터와 페이지 전체를 파이프라인 한 번으로 저장
+    Args:
+        pages: {페이지 번호: 페이지 데이터}
+    """
+    mapping = {page_field(number): encode_page(data) for number, data in pages.items()}
+    mapping[META_FIELD] = json.dumps(meta, ensure_ascii=False)
+
+    pipe = redis_client.pipeline()
+    pipe.delete(document_key(file_id, kind))
+    pipe.hset(document_key(file_id, kind), mapping=mapping)
+    _index_document(pipe, file_id, meta, kind)
+    pipe.execute()
+
+
+def get_meta(file_id, kind="pdf"):
+    raw = redis_client.hget(document_key(file_id, kind), META_FIELD)
+    if not raw:
+        return None
+    return json.loads(raw)
+
+
+def get_pages(file_id, page_range=None, kind="pdf"):
+    """
+    페이지를 HMGET 한 번으로 조회
+    Args:
+        page_range: 조회할 페이지 번호 목록 (range 등). 생략하면 전체 페이지
+    Returns:
+        list: [(페이지 번호, 페이지 데이터)] (저장되지 않은 페이지는 제외)
+    """
+    if page_range is None:
+        meta = get_meta(file_id, kind)
+        if not meta:
+            return []
+        page_range = range(1, int(meta.get("total_pages", meta.get("total_lines", 0))) + 1)
+
+    page_numbers = list(page_range)
+    if not page_numbers:
+        return []
+
+    raw_pages = redis_client.hmget(document_key(file_id, kind), [page_field(n) for n in page_numbers])
+    return [
+        (number, decode_page(raw))
+        for number, raw in zip(page_numbers, raw_pages)
+        if raw
+    ]
+
+
+def copy_document(source_file_id, file_id, meta, kind="pdf"):
+    """
+    저장된 페이지를 압축 해제 없이 다른 file_id로 복사하고 메타데이터만 교체
+    Returns:
+        bool: 원본 문서가 있어 복사했는지 여부
+    """
+    fields = redis_client.hgetall(document_key(source_file_id, kind))
+    if not fields:
+        return False
+
+    fields[META_FIELD.encode()] = json.dumps(meta, ensure_ascii=False)
+    pipe = redis_client.pipeline()
+    pipe.delete(document_key(file_id, kind))
+    pipe.hset(document_key(file_id, kind), mapping=fields)
+    _index_document(pipe, file_id, meta, kind)
+    pipe.execute()
+    return True
+
+
+def get_pending_files(user_id):
+    """
+    Pinecone 업로드 대기 중인 사용자의 PDF file_id 목록
+    """
+    return sorted(member.decode("utf-8") for member in redis_client.smembers(pending_files_key(user_id)))
+
+
+def delete_document(file_id, kind="pdf"):
+    """
+    문서 해시를 삭제하고 소유자의 인덱스에서도 제거
+    Returns:
+        bool: 삭제된 문서가 있었는지 여부
+    """
+    meta = get_meta(file_id, kind) or {}
+
+    pipe = redis_client.pipeline()
+    pipe.delete(document_key(file_id, kind))
+    if kind == "pdf" and meta.get("user_id") is not None:
+        pipe.srem(pending_files_key(meta["user_id"]), file_id)
+    deleted, *_ = pipe.execute()
+    return deleted > 0
+
+
+def ingest_job_key(job_id):
+    return f"ingest_job:{job_id}"
+
+
+def store_ingest_job(job_id, user_id, file_id):
+    """
+    업로드 처리 작업을 시작한 사용자와 file_id 기록
+    """
+    redis_client.set(ingest_job_key(job_id), json.dumps({"user_id": user_id, "file_id": file_id}), ex=INGEST_JOB_TTL)
+
+
+def get_ingest_job(job_id):
+    """
+    업로드 처리 작업의 소유자와 file_id 조회 (기록이 없으면 None)
+    """
+    raw = redis_client.get(ingest_job_key(job_id))
+    if not raw:
+        return None
+    return json.loads(raw)
@@ -0,0 +1,148 @@
+import os
+import logging
+import shutil
+import tempfile
+from celery import shared_task
+from celery.signals import worker_ready
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from .converter import get_libreoffice_pool
+from .models import UploadedPDF
+from .utils import (
+    extract_and_store_pdf_to_redis,
+    reuse_extracted_pages,
+    ppt_to_pdf,
+    word_to_pdf,
+    image_to_pdf
+)
+
+IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png']
+
+# 확장자별 PDF 변환 함수
+PDF_CONVERTERS = {
+    '.pptx': ppt_to_pdf,
+    '.docx': word_to_pdf,
+    '.jpg': image_to_pdf,
+    '.jpeg': image_to_pdf,
+    '.png': image_to_pdf,
+}
+
+SUPPORTED_EXTENSIONS = ['.pdf', *PDF_CONVERTERS]
+
+logger = logging.getLogger(__name__)
+
+
+@worker_ready.connect
+def start_libreoffice_pool(sender=None, **kwargs):
+    """
+    PDF 변환 큐(pdf_ingest)를 처리하는 워커만 준비 시 LibreOffice 인스턴스를 미리 띄워 첫 변환의 콜드 스타트 제거
+    다른 워커는 변환을 하지 않으므로 띄우지 않음 (그래도 변환 요청이 오면 첫 변환 시 풀 생성)
+    """
+    if settings.LIBREOFFICE_POOL_SIZE <= 0:
+        return
+
+    task_consumer = getattr(sender, "task_consumer", None)
+    queues = {queue.name for queue in getattr(task_consumer, "queues", None) or []}
+    if settings.CELERY_PDF_INGEST_QUEUE not in queues:
+        return
+
+    try:
+        get_libreoffice_pool()
+    except Exception as e:
+        # 미리 띄우지 못해도 첫 변환 요청 시 다시 시도
+        logger.warning(f"LibreOffice 풀 시작 실패: {str(e)}")
+
+
+@shared_task(bind=True)
+def ingest_uploaded_file_task(self, file_id, source_file_id=None, image_names=None):
+    """
+    Celery 태스크: 업로드된 파일을 PDF로 변환하고 페이지별 텍스트를 Redis에 저장
+    source_file_id가 주어지면 같은 내용으로 이미 처리된 파일의 추출 결과와 임베딩을 재사용
+    image_names가 주어지면 저장소에 임시 저장된 여러 이미지를 한 개의 PDF로 합쳐 파일로 저장
+    진행 상황은 태스크 상태(CONVERTING, PROGRESS)의 meta로 보고
+    """
+    file_instance = UploadedPDF.objects.get(id=file_id)
+    output_dir = None
+
+    def report_progress(pages_done, total_pages):
+        self.update_state(state="PROGRESS", meta={
+            "file_id": file_id,
+            "pages_done": pages_done,
+            "total_pages": total_pages,
+        })
+
+    try:
+        # 0. 중복 업로드인 경우 기존 추출 결과 재사용 (재사용할 데이터가 없으면 새로 추출)
+        total_pages = None
+        source_file = UploadedPDF.objects.filter(id=source_file_id).first() if source_file_id else None
+        if source_file:
+            total_pages = reuse_extracted_pages(
+                source_file,
+                file_instance.id,
+                file_instance.file_name,
+                user_id=file_instance.user_id,
+                progress_callback=report_progress,
+            )
+
+        # 1. PDF가 아닌 경우 임시 디렉터리에 PDF로 변환
+        if total_pages is not None:
+            pdf_path = None
+        elif image_names:
+            # 여러 이미지를 한 개의 PDF로 합친 뒤 업로드 파일로 저장
+            self.update_state(state="CONVERTING", meta={"file_id": file_id, "pages_done": 0, "total_pages": None})
+            output_dir = tempfile.mkdtemp(prefix="ingest_")
+            pdf_path = os.path.join(output_dir, f"{os.path.splitext(file_instance.file_name)[0]}.pdf")
+            image_to_pdf([default_storage.path(name) for name in image_names], pdf_path)
+
+            with open(pdf_path, "rb") as pdf_file:
+                file_instance.file.save(os.path.basename(pdf_path), File(pdf_file), save=True)
+        elif os.path.splitext(file_instance.file.name)[1].lower() == '.pdf':
+            pdf_path = file_instance.file.path
+        else:
+            source_path = file_instance.file.path
+            file_extension = os.path.splitext(source_path)[1].lower()
+            converter = PDF_CONVERTERS.get(file_extension)
+            if not converter:
+                raise ValueError(f"지원되지 않는 파일 형식입니다: {file_extension}")
+
+            self.update_state(state="CONVERTING", meta={"file_id": file_id, "pages_done": 0, "total_pages": None})
+            output_dir = tempfile.mkdtemp(prefix="ingest_")
+            base_name = os.path.splitext(os.path.basename(source_path))[0]
+            pdf_path = os.path.join(output_dir, f"{base_name}.pdf")
+            converter(source_path, pdf_path)
+
+        # 2. 텍스트 추출 및 Redis 저장 (페이지마다 진행 상황 보고)
+        if pdf_path:
+            total_pages = extract_and_store_pdf_to_redis(
+                pdf_path,
+                file_instance.id,
+                file_instance.file_name,
+                user_id=file_instance.user_id,
+                progress_callback=report_progress,
+            )
+
+        # 추출 완료 표시 (이후 같은 내용의 업로드가 이 파일을 재사용)
+        file_instance.total_pages = total_pages
+        file_instance.save(update_fields=["total_pages"])
+
+    except Exception:
+        # 실패 시 업로드 기록 삭제 (중복 업로드끼리 공유하는 파일은 남겨둠) 후 예외를 그대로 올려 FAILURE 상태로 기록
+        if file_instance.file and not UploadedPDF.objects.filter(file=file_instance.file.name).exclude(id=file_instance.id).exists():
+            file_instance.file.delete(save=False)
+        file_instance.delete()
+        raise
+
+    finally:
+        if output_dir:
+            shutil.rmtree(output_dir, ignore_errors=True)
+        # 임시 저장한 원본 이미지 삭제
+        for name in image_names or []:
+            default_storage.delete(name)
+
+    return {
+        "file_id": file_id,
+        "file_name": file_instance.file_name,
+        "pages_done": total_pages,
+        "total_pages": total_pages,
+    }
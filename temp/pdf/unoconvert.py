@@ -0,0 +1,88 @@
+"""
+LibreOffice UNO 변환 헬퍼
+uno 모듈이 있는 시스템 python(python3-uno)으로 실행되며, 상주 중인 soffice 인스턴스에
+파이프로 접속해 문서를 PDF로 변환한다. Django 코드를 import 하지 않는 독립 스크립트.
+
+사용법: python3 unoconvert.py --pipe <pipe_name> <input_path> <output_path>
+"""
+import argparse
+import os
+import sys
+import time
+
+import uno
+from com.sun.star.beans import PropertyValue
+from com.sun.star.connection import NoConnectException
+
+# 문서 종류별 PDF 내보내기 필터
+PDF_EXPORT_FILTERS = [
+    ("com.sun.star.presentation.PresentationDocument", "impress_pdf_Export"),
+    ("com.sun.star.sheet.SpreadsheetDocument", "calc_pdf_Export"),
+    ("com.sun.star.drawing.DrawingDocument", "draw_pdf_Export"),
+    ("com.sun.star.text.TextDocument", "writer_pdf_Export"),
+]
+
+
+def property_value(name, value):
+    prop = PropertyValue()
+    prop.Name = name
+    prop.Value = value
+    return prop
+
+
+def connect(pipe_name, timeout):
+    """
+    soffice 인스턴스에 접속 (막 시작된 인스턴스는 준비될 때까지 재시도)
+    """
+    local_context = uno.getComponentContext()
+    resolver = local_context.ServiceManager.createInstanceWithContext(
+        "com.sun.star.bridge.UnoUrlResolver", local_context
+    )
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return resolver.resolve(f"uno:pipe,name={pipe_name};urp;StarOffice.ComponentContext")
+        except NoConnectException:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.2)
+
+
+def pdf_filter_for(document):
+    for service, filter_name in PDF_EXPORT_FILTERS:
+        if document.supportsService(service):
+            return filter_name
+    return "writer_pdf_Export"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pipe", required=True)
+    parser.add_argument("--connect-timeout", type=float, default=30)
+    parser.add_argument("input_path")
+    parser.add_argument("output_path")
+    args = parser.parse_args()
+
+    context = connect(args.pipe, args.connect_timeout)
+    desktop = context.ServiceManager.createInstanceWithContext("com.sun.star.frame.Desktop", context)
+
+    document = desktop.loadComponentFromURL(
+        uno.systemPathToFileUrl(os.path.abspath(args.input_path)),
+        "_blank",
+        0,
+        (property_value("Hidden", True), property_value("ReadOnly", True)),
+    )
+    if document is None:
+        sys.exit(f"Failed to load document: {args.input_path}")
+
+    try:
+        document.storeToURL(
+            uno.systemPathToFileUrl(os.path.abspath(args.output_path)),
+            (property_value("FilterName", pdf_filter_for(document)),),
+        )
+    finally:
+        document.close(True)
+
+
+if __name__ == "__main__":
+    main()
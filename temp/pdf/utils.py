@@ -1,17 +1,21 @@
 import fitz
-import json
+import hashlib
+import logging
 import os
-from fpdf import FPDF
-from PIL import Image
+from PIL import Image, ImageOps
+from concurrent.futures import ThreadPoolExecutor
 from django.conf import settings
-from pymupdf4llm.helpers.pymupdf_rag import to_markdown
-from config.settings import redis_client
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter
 from io import BytesIO
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
-import subprocess
+from .converter import convert_with_libreoffice
+from .storage import PageWriter, mark_pending, store_meta, store_document, copy_document
+from .extract import convert_rect_objects, iter_pdf_pages, iter_pdf_pages_parallel
+from temp.pinecone.service import get_pinecone_instance, fetch_file_page_vectors
+
+logger = logging.getLogger(__name__)
 
 # 한국어 폰트 등록 (나눔고딕 예시)
 FONT_NAME = "NanumGothic"
@@ -22,55 +26,109 @@ LEFT_MARGIN = 50  # 왼쪽 여백
 RIGHT_MARGIN = 50  # 오른쪽 여백
 LINE_HEIGHT = 15  # 줄 간격
 
-
-def convert_rect_objects(data):
-    """데이터 구조에서 Rect 객체를 재귀적으로 변환"""
-    if isinstance(data, dict):
-        # 딕셔너리 내부 Rect 변환
-        return {k: convert_rect_objects(v) for k, v in data.items()}
-    elif isinstance(data, list):
-        # 리스트 내부 Rect 변환
-        return [convert_rect_objects(item) for item in data]
-    elif isinstance(data, fitz.Rect):
-        # Rect 객체를 [x0, y0, x1, y1] 리스트로 변환
-        return [data.x0, data.y0, data.x1, data.y1]
-    else:
-        # Rect가 아닌 경우 그대로 반환
-        return data
+# 이미지 -> PDF 변환 시 페이지 해상도 (A4, 150 DPI)
+IMAGE_PAGE_DPI = 150
+IMAGE_PAGE_WIDTH, IMAGE_PAGE_HEIGHT = 1240, 1754
 
 
-def extract_and_store_pdf_to_redis(pdf_path, file_id, file_name):
+def extract_and_store_pdf_to_redis(pdf_path, file_id, file_name, user_id=None, workers=None, progress_callback=None):
     """
     PDF 텍스트를 페이지별로 Redis에 저장하고 파일 이름 메타데이터 추가
+    페이지를 하나씩 추출해 바로 저장하므로 마지막 페이지 추출 전에도 앞 페이지 조회 가능
+    페이지 수가 많으면 여러 프로세스에서 병렬로 추출 (workers 미지정 시 settings 값 사용)
+    progress_callback(pages_done, total_pages)이 주어지면 페이지 저장 때마다 호출
+    user_id가 주어지면 모든 페이지를 저장한 뒤 해당 사용자의 업로드 대기 파일 인덱스에 등록
     """
     try:
-        # PDF 텍스트를 페이지별로 추출
-        md_text = to_markdown(pdf_path, page_chunks=True)
+        with fitz.open(pdf_path) as doc:
+            page_count = doc.page_count
+
+        # 추출 방식 선택: 큰 문서는 프로세스 풀 병렬 추출, 작은 문서는 순차 추출
+        if workers is None:
+            workers = settings.PDF_EXTRACT_WORKERS
+        if workers > 1 and page_count >= settings.PDF_PARALLEL_MIN_PAGES:
+            pages = iter_pdf_pages_parallel(pdf_path, workers)
+        else:
+            pages = iter_pdf_pages(pdf_path)
 
-        # 반환된 데이터 디버깅용 출력
-        print("Original Extracted Data:", md_text)
+        # Redis에 파일 메타데이터 먼저 저장 (업로드 대기 인덱스에는 아직 추가하지 않음)
+        meta = {"file_name": file_name, "total_pages": page_count, "user_id": user_id}
+        store_meta(file_id, meta)
 
-        # Rect 객체를 재귀적으로 변환
-        md_text = convert_rect_objects(md_text)
+        # Redis 해시에 페이지별 데이터 저장 (한 페이지씩 추출, 몇 페이지씩 모아 파이프라인으로 저장)
+        total_pages = 0
+        with PageWriter(file_id) as writer:
+            for page_num, page_text in pages:
+                writer.add(page_num, {"page_number": page_num, "text": page_text})
+                total_pages = page_num
+                del page_text
 
-        # 변환된 데이터 디버깅용 출력
-        print("Converted Data for Redis:", md_text)
+                if progress_callback:
+                    progress_callback(page_num, page_count)
 
-        # Redis에 페이지별 데이터 저장
-        for page_num, page_text in enumerate(md_text, start=1):
-            redis_key = f"pdf:{file_id}:page:{page_num}"
-            redis_client.set(redis_key, json.dumps({"page_number": page_num, "text": page_text}))
+        # 마지막 페이지까지 저장된 뒤에만 업로드 대기 인덱스에 추가 (추출 중인 문서가 업로드/삭제되지 않도록)
+        mark_pending(file_id, meta)
 
-        # Redis에 파일 메타데이터 저장
-        meta_key = f"pdf:{file_id}:meta"
-        redis_client.set(meta_key, json.dumps({"file_name": file_name, "total_pages": len(md_text)}))
+        logger.info(f"Stored {total_pages} pages for file_id {file_id} in Redis")
 
         # 총 페이지 수 반환
-        return len(md_text)
+        return total_pages
 
     except Exception as e:
-        print("Error in extract_and_store_pdf_to_redis:", str(e))
-        raise e
+        logger.exception(f"Error in extract_and_store_pdf_to_redis for file_id {file_id}: {str(e)}")
+        raise
+
+def reuse_extracted_pages(source_file, file_id, file_name, user_id=None, progress_callback=None):
+    """
+    같은 내용의 파일이 이미 처리된 경우 추출 결과와 임베딩을 재사용해 Redis에 저장
+    Redis에 원본 페이지가 남아 있으면 복사하고, 이미 Pinecone으로 옮겨졌으면 벡터와 원문을 가져옴
+    Returns:
+        int | None: 저장한 페이지 수 (재사용할 데이터가 없으면 None)
+    """
+    total_pages = source_file.total_pages
+    if not total_pages:
+        return None
+
+    meta = {"file_name": file_name, "total_pages": total_pages, "user_id": user_id}
+
+    # 1. 원본 파일의 페이지가 아직 Redis에 있으면 그대로 복사
+    if not copy_document(source_file.id, file_id, meta):
+        # 2. Pinecone에 업로드된 경우 원문과 임베딩 벡터를 함께 가져와 임베딩 재계산 생략
+        page_vectors = fetch_file_page_vectors(
+            get_pinecone_instance(),
+            os.getenv("PINECONE_INDEX_NAME", "pdf-index"),
+            source_file.user_id,
+            source_file.id,
+            total_pages,
+        )
+        if len(page_vectors) < total_pages:
+            return None
+
+        store_document(file_id, meta, {
+            page_num: {
+                "page_number": page_num,
+                "text": page_vectors[page_num]["metadata"].get("original_text", ""),
+                "embedding": page_vectors[page_num]["values"],
+            }
+            for page_num in range(1, total_pages + 1)
+        })
+
+    if progress_callback:
+        progress_callback(total_pages, total_pages)
+
+    return total_pages
+
+
+def compute_file_hash(*uploaded_files):
+    """
+    업로드된 파일(여러 개면 순서대로 이어붙인) 내용의 SHA-256 해시를 계산
+    """
+    sha256 = hashlib.sha256()
+    for uploaded_file in uploaded_files:
+        for chunk in uploaded_file.chunks():
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
 
 def extract_and_store_text_to_redis(input_text, file_id, file_name):
     """
@@ -83,24 +141,26 @@ def extract_and_store_text_to_redis(input_text, file_id, file_name):
         # 빈 줄 제거
         text_lines = [line.strip() for line in text_lines if line.strip()]
 
-        # 변환된 데이터 디버깅용 출력
-        print("Processed Text Data for Redis:", text_lines)
-
-        # Redis에 줄 단위 데이터 저장
-        for line_num, line_text in enumerate(text_lines, start=1):
-            redis_key = f"text:{file_id}:line:{line_num}"
-            redis_client.set(redis_key, json.dumps({"line_number": line_num, "text": line_text}))
+        # Redis 해시 하나에 줄 단위 데이터와 파일 메타데이터를 함께 저장
+        store_document(
+            file_id,
+            {"file_name": file_name, "total_lines": len(text_lines)},
+            {
+                line_num: {"line_number": line_num, "text": line_text}
+                for line_num, line_text in enumerate(text_lines, start=1)
+            },
+            kind="text",
+        )
 
-        # Redis에 파일 메타데이터 저장
-        meta_key = f"text:{file_id}:meta"
-        redis_client.set(meta_key, json.dumps({"file_name": file_name, "total_lines": len(text_lines)}))
+        # 원문은 로그에 남기지 않고 줄 수만 기록
+        logger.info(f"Stored {len(text_lines)} lines for file_id {file_id} in Redis")
 
         # 총 줄 수 반환
         return len(text_lines)
 
     except Exception as e:
-        print("Error in extract_and_store_text_to_redis:", str(e))
-        raise e
+        logger.exception(f"Error in extract_and_store_text_to_redis for file_id {file_id}: {str(e)}")
+        raise
 
 def pdf_to_text(text_data):
     """
@@ -159,42 +219,40 @@ def local_file_upload(file_path, uploaded_file):
             temp_file.write(chunk)
 
 def ppt_to_pdf(input_path, output_path):
-    subprocess.run([
-        "libreoffice",
-        "--headless",
-        "--convert-to",
-        "pdf",
-        "--outdir",
-        os.path.dirname(output_path),
-        input_path
-    ], check=True)
+    # 상주 중인 LibreOffice 인스턴스 풀에서 .pptx 파일을 .pdf로 변환
+    convert_with_libreoffice(input_path, output_path)
 
 def word_to_pdf(input_path, output_path):
-    # LibreOffice를 headless 모드로 실행하여 .docx 파일을 .pdf로 변환
-    subprocess.run([
-        "libreoffice",
-        "--headless",
-        "--convert-to",
-        "pdf",
-        "--outdir",
-        os.path.dirname(output_path),
-        input_path
-    ], check=True)
-
-def image_to_pdf(input_path, output_path):
-    image = Image.open(input_path)
-    pdf = FPDF()
-    pdf.add_page()
-
-    image_width, image_height = image.size
-    aspect_ratio = image_height / image_width
-    pdf_width = 210  # A4 크기 (mm)
-    pdf_height = pdf_width * aspect_ratio
-
-    temp_image_path = "/tmp/temp_image.jpg"
-    image.save(temp_image_path)
-
-    pdf.image(temp_image_path, x=0, y=0, w=pdf_width, h=pdf_height)
-    os.remove(temp_image_path)
-
-    pdf.output(output_path)
\ No newline at end of file
+    # 상주 중인 LibreOffice 인스턴스 풀에서 .docx 파일을 .pdf로 변환
+    convert_with_libreoffice(input_path, output_path)
+
+def load_page_image(input_path):
+    """
+    이미지를 디코딩하여 EXIF 회전을 보정하고 PDF 페이지 해상도로 축소
+    """
+    with Image.open(input_path) as image:
+        # JPEG은 디코딩 단계에서 바로 축소 (큰 휴대폰 사진의 디코딩 비용 감소)
+        image.draft("RGB", (IMAGE_PAGE_WIDTH, IMAGE_PAGE_HEIGHT))
+        image = ImageOps.exif_transpose(image).convert("RGB")
+
+    image.thumbnail((IMAGE_PAGE_WIDTH, IMAGE_PAGE_HEIGHT))
+    return image
+
+def image_to_pdf(input_paths, output_path):
+    """
+    이미지(여러 장 가능)를 임시 파일 없이 메모리에서 하나의 PDF로 변환 (이미지 한 장당 한 페이지)
+    """
+    if isinstance(input_paths, str):
+        input_paths = [input_paths]
+
+    # 이미지 디코딩/축소는 병렬로 처리하고 순서는 유지
+    with ThreadPoolExecutor(max_workers=max(1, min(len(input_paths), settings.IMAGE_DECODE_WORKERS))) as executor:
+        pages = list(executor.map(load_page_image, input_paths))
+
+    pages[0].save(
+        output_path,
+        "PDF",
+        save_all=True,
+        append_images=pages[1:],
+        resolution=IMAGE_PAGE_DPI,
+    )
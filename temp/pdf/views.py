@@ -1,32 +1,84 @@
 import os
-import redis
 import logging
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import status
-from rest_framework.utils import json
 from rest_framework.views import APIView
 from swagger.file_upload_docs import pdf_upload_doc, genealogy_upload_doc
 from rest_framework.parsers import MultiPartParser
 from temp.pdf.models import UploadedPDF
 from temp.pdf.utils import (
-    extract_and_store_pdf_to_redis,
     pdf_to_text,
-    local_file_upload,
     extract_and_store_text_to_redis,
-    ppt_to_pdf,
-    word_to_pdf,
-    image_to_pdf
+    compute_file_hash,
 )
+from temp.pdf.storage import get_meta, get_pages, delete_document, get_ingest_job, store_ingest_job
+from temp.pdf.tasks import ingest_uploaded_file_task, SUPPORTED_EXTENSIONS, IMAGE_EXTENSIONS
+from django.core.files.storage import default_storage
+from celery.result import AsyncResult
+from drf_yasg.utils import swagger_auto_schema
+from drf_yasg import openapi
 from django.http import FileResponse, Http404
 from temp.pinecone.models import PineconeSummary
 import uuid
 
-# Redis 연결 설정
-redis_client = redis.StrictRedis(host='redis', port=6379, db=0)
-
 logger = logging.getLogger(__name__)
 
+
+def start_ingest(user, uploaded_files, file_name):
+    """
+    업로드 파일을 저장하고 변환/추출 작업을 시작
+    이미지가 여러 장이면 저장소에 임시 저장한 뒤 작업에서 한 개의 PDF로 합침
+    같은 내용(SHA-256)의 파일이 이미 처리되어 있으면 파일을 다시 저장하지 않고
+    기존 파일을 요청 사용자에게 연결한 뒤 추출 결과와 임베딩을 재사용
+    Returns:
+        (UploadedPDF, AsyncResult, bool): 생성된 파일 객체, 작업, 중복 재사용 여부
+    """
+    content_hash = compute_file_hash(*uploaded_files)
+    source_file = (
+        UploadedPDF.objects
+        .filter(content_hash=content_hash, total_pages__isnull=False)
+        .order_by('-uploaded_at')
+        .first()
+    )
+
+    image_names = None
+    if source_file:
+        file = source_file.file.name
+    elif len(uploaded_files) == 1:
+        file = uploaded_files[0]
+    else:
+        # 여러 이미지는 작업에서 PDF로 합친 뒤 파일로 저장
+        file = None
+        upload_dir = f"uploads/{uuid.uuid4()}"
+        image_names = [
+            default_storage.save(f"{upload_dir}/{index:03d}_{image.name}", image)
+            for index, image in enumerate(uploaded_files)
+        ]
+
+    file_instance = UploadedPDF(
+        file=file,
+        file_name=file_name,
+        user=user,  # 현재 요청한 사용자 정보 추가
+        content_hash=content_hash,
+    )
+    file_instance.save()
+
+    # 상태 조회 시 작업 소유자를 확인할 수 있도록 작업 ID를 먼저 정해 기록한 뒤 작업 시작
+    # (응답을 받자마자 상태를 조회해도 404가 나지 않도록)
+    task_id = str(uuid.uuid4())
+    store_ingest_job(task_id, user.id, file_instance.id)
+    task = ingest_uploaded_file_task.apply_async(
+        args=(file_instance.id,),
+        kwargs={
+            "source_file_id": source_file.id if source_file else None,
+            "image_names": image_names,
+        },
+        task_id=task_id,
+    )
+    return file_instance, task, source_file is not None
+
+
 class PDFUploadView(APIView):
     """PDF 파일 업로드 및 텍스트 추출"""
     permission_classes = [IsAuthenticated]  # 인증된 사용자만 접근 가능
@@ -40,93 +92,72 @@ class PDFUploadView(APIView):
 
         if 'file' not in request.FILES:
             return Response({"error": "파일을 업로드해주세요."}, status=status.HTTP_400_BAD_REQUEST)
-        uploaded_file = request.FILES['file']
-        file_name = uploaded_file.name
+        uploaded_files = request.FILES.getlist('file')
+        file_name = uploaded_files[0].name
         file_extension = os.path.splitext(file_name)[1].lower()
 
-        # 파일이 pdf인 경우
-        if file_extension == '.pdf':
-            # 임시 경로에 파일 저장
-            pdf_path = f"/tmp/{file_name}"
-            local_file_upload(pdf_path, uploaded_file)
-
-            # PDF 객체 생성 및 저장
-            file_instance = UploadedPDF(
-                file=uploaded_file,
-                file_name=file_name,
-                user=request.user  # 현재 요청한 사용자 정보 추가
-            )
-            file_instance.save()
-
-            # 텍스트 추출 및 Redis 저장
-            try:
-                total_pages = extract_and_store_pdf_to_redis(pdf_path, file_instance.id, file_name)
-            except Exception as e:
-                os.remove(pdf_path)
-                file_instance.delete()
-                return Response({"error": f"Failed to process PDF: {str(e)}"},
-                                status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-            os.remove(pdf_path)
-            return Response({
-                "message": "File uploaded and text extracted successfully",
-                "file_id": file_instance.id,
-                "total_pages": total_pages
-            }, status=status.HTTP_201_CREATED)
+        if len(uploaded_files) > 1:
+            # 여러 파일은 이미지(필기 사진 등)만 허용하며 한 개의 PDF로 합침
+            if any(os.path.splitext(f.name)[1].lower() not in IMAGE_EXTENSIONS for f in uploaded_files):
+                return Response({"error": "여러 파일은 이미지(jpg, jpeg, png)만 함께 업로드할 수 있습니다."},
+                                status=status.HTTP_400_BAD_REQUEST)
+            file_name = f"{os.path.splitext(file_name)[0]}.pdf"
+        elif file_extension not in SUPPORTED_EXTENSIONS:
+            return Response({"error": "지원되지 않는 파일 형식입니다."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # 파일 객체 생성 및 변환/추출 비동기 작업 실행
+        file_instance, task, deduplicated = start_ingest(request.user, uploaded_files, file_name)
+        logger.info(f"파일 처리 작업 시작: file_id={file_instance.id}, job_id={task.id}, deduplicated={deduplicated}")
+
+        return Response({
+            "message": "File uploaded. Text extraction started.",
+            "job_id": task.id,
+            "file_id": file_instance.id,
+            "deduplicated": deduplicated,
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+class PDFIngestStatusView(APIView):
+    """업로드 파일 처리 작업의 진행 상태 조회"""
+    permission_classes = [IsAuthenticated]  # 인증된 사용자만 접근 가능
+
+    @swagger_auto_schema(
+        operation_description="업로드 파일 처리 작업의 상태, 처리된 페이지 수, 에러를 조회하는 API",
+        responses={
+            200: openapi.Response(description="Job status returned"),
+            404: openapi.Response(description="Job not found"),
+        }
+    )
+    def get(self, request, job_id):
+        # 요청한 사용자가 시작한 작업만 조회 가능 (다른 사용자의 파일 정보/에러 노출 방지)
+        job = get_ingest_job(job_id)
+        if not job or job["user_id"] != request.user.id:
+            return Response({"error": "Job not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        result = AsyncResult(job_id)
+        info = result.info if isinstance(result.info, dict) else {}
+
+        error = None
+        if result.state == "FAILURE":
+            error = str(result.info)
+
+        return Response({
+            "job_id": job_id,
+            "state": result.state,
+            "file_id": job["file_id"],
+            "pages_done": info.get("pages_done", 0),
+            "total_pages": info.get("total_pages"),
+            "error": error,
+        }, status=status.HTTP_200_OK)
 
-        else :
-            temp_file_path = f"/tmp/{file_name}"
-            output_pdf_path = f"/tmp/{os.path.splitext(file_name)[0]}.pdf"
-
-            # 1. 업로드된 파일을 로컬에 저장
-            local_file_upload(temp_file_path, uploaded_file)
-
-            # 2. 파일 변환
-            try:
-                if file_extension == '.pptx':
-                    ppt_to_pdf(temp_file_path, output_pdf_path)
-                elif file_extension == '.docx':
-                    word_to_pdf(temp_file_path, output_pdf_path)
-                elif file_extension in ['.jpg', '.jpeg', '.png']:
-                    image_to_pdf(temp_file_path, output_pdf_path)
-                else:
-                    return Response({"error": "지원되지 않는 파일 형식입니다."}, status=status.HTTP_400_BAD_REQUEST)
-                logger.info(f"PDF 변환 완료: {output_pdf_path}")
-            except Exception as e:
-                logger.error(f"파일 변환 실패: {str(e)}")
-                return Response({"error": f"파일 변환 실패: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            finally:
-                if os.path.exists(temp_file_path):
-                    os.remove(temp_file_path)
-
-            file_instance = UploadedPDF(file=output_pdf_path, file_name=file_name)
-            file_instance.save()
-
-            # 텍스트 추출 및 Redis 저장
-            try:
-                total_pages = extract_and_store_pdf_to_redis(output_pdf_path, file_instance.id, file_name)
-            except Exception as e:
-                os.remove(output_pdf_path)
-                file_instance.delete()
-                return Response({"error": f"Failed to process PDF: {str(e)}"},
-                                status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-            os.remove(output_pdf_path)
-            return Response({
-                "message": "File uploaded and text extracted successfully",
-                "file_id": file_instance.id,
-                "total_pages": total_pages
-            }, status=status.HTTP_201_CREATED)
-          
 
 class PDFPageTextView(APIView):
     """Redis에서 특정 PDF의 페이지 텍스트 확인"""
     def get(self, request, file_id, page_number):
-        redis_key = f"pdf:{file_id}:page:{page_number}"
-        text = redis_client.get(redis_key)
-        if not text:
+        pages = get_pages(file_id, [page_number])
+        if not pages:
             return Response({"error": "Page not found"}, status=404)
-        text = json.loads(text)  # JSON 문자열을 dict로 변환
+        _, text = pages[0]
         return Response({
             "page_number": text["page_number"],
             "text": text["text"]
@@ -137,18 +168,19 @@ class PDFDeleteByFileIDView(APIView):
     """
     특정 file_id와 관련된 모든 Redis 데이터를 삭제
     """
+    permission_classes = [IsAuthenticated]  # 인증된 사용자만 접근 가능
+
     def delete(self, request, file_id):
         try:
-            # 해당 file_id와 관련된 모든 키를 검색
-            pattern = f"pdf:{file_id}:*"
-            keys = redis_client.keys(pattern)
-
-            # 키가 없을 경우 에러 반환
-            if not keys:
+            # 다른 사용자가 올린 파일은 삭제 불가 (소유자가 기록되지 않은 이전 문서, 족보 텍스트는 관리자만 삭제)
+            meta = get_meta(file_id) or {}
+            owner_id = meta.get("user_id")
+            if owner_id != request.user.id and not (owner_id is None and request.user.is_staff):
                 return Response({"message": f"No data found for file_id {file_id}"}, status=status.HTTP_404_NOT_FOUND)
 
-            # 모든 키 삭제
-            redis_client.delete(*keys)
+            # 해당 file_id의 문서 해시와 인덱스 삭제 (없으면 에러 반환)
+            if not delete_document(file_id):
+                return Response({"message": f"No data found for file_id {file_id}"}, status=status.HTTP_404_NOT_FOUND)
 
             return Response({"message": f"All pages for file_id {file_id} have been deleted."}, status=status.HTTP_200_OK)
         except Exception as e:
@@ -199,35 +231,19 @@ class GenealogyUploadView(APIView):
                 base_name, extension = os.path.splitext(file_name)
                 file_name = f"{base_name}_족보{extension}"
 
-            # PDF 객체 생성 및 저장
-            file_instance = UploadedPDF(
-                file=uploaded_file,
-                file_name=file_name,
-                user=request.user  # 현재 요청한 사용자 정보 추가
-            )
-            file_instance.save()
-
-            # 임시 경로에 파일 저장
-            pdf_path = f"/tmp/{file_name}"
-            local_file_upload(pdf_path, uploaded_file)
-
-            # 텍스트 추출 및 Redis 저장
-            try:
-                total_pages = extract_and_store_pdf_to_redis(pdf_path, file_instance.id, file_name)
-            except Exception as e:
-                os.remove(pdf_path)
-                file_instance.delete()
-                return Response({"error": f"Failed to process PDF: {str(e)}"},
-                                status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-            os.remove(pdf_path)
+            if os.path.splitext(file_name)[1].lower() not in SUPPORTED_EXTENSIONS:
+                return Response({"error": "지원되지 않는 파일 형식입니다."}, status=status.HTTP_400_BAD_REQUEST)
+
+            # 파일 객체 생성 및 텍스트 추출 비동기 작업 실행
+            file_instance, task, deduplicated = start_ingest(request.user, [uploaded_file], file_name)
 
             return Response({
-                "message": "File uploaded and text extracted successfully",
+                "message": "File uploaded. Text extraction started.",
+                "job_id": task.id,
                 "file_id": file_instance.id,
                 "file_name": file_name,
-                "total_pages": total_pages
-            }, status=status.HTTP_201_CREATED)
+                "deduplicated": deduplicated,
+            }, status=status.HTTP_202_ACCEPTED)
 
         # 텍스트만 저장 처리
         elif text:
@@ -1,21 +1,44 @@
+import json
+import logging
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from django.conf import settings
 from pinecone import Pinecone, ServerlessSpec
-from temp.openaiService import generate_summary
+from temp import keyword_index
+from temp.resilience import ResilientPineconeIndex
+from temp.openaiService import generate_summary, get_embeddings
 from .models import PineconeSummary
 
-# Pinecone 초기화
+logger = logging.getLogger(__name__)
+
+# Pinecone 클라이언트/인덱스 레지스트리
+# 프로세스마다 클라이언트와 인덱스 핸들을 한 번만 만들어 재사용 (HTTP 연결 풀 유지)
+# 인덱스 존재 확인(list_indexes)은 처음 사용할 때와 인덱스를 찾지 못했을 때만 수행
+# Celery prefork 워커처럼 fork된 자식 프로세스는 부모의 연결 풀을 공유하지 않도록 레지스트리를 비움
+# settings.VECTOR_BACKEND == "local" 이면 Pinecone 대신 같은 인터페이스의 로컬 벡터 인덱스(temp/vector_store.py) 사용
+_client = None
+_indexes = {}
+_registry_lock = threading.RLock()
+
+
 def get_pinecone_instance():
     """
-    Pinecone 인스턴스를 생성
+    프로세스 공용 Pinecone 인스턴스를 반환 (처음 호출할 때 생성, 로컬 벡터 백엔드이면 None)
     """
-    return Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+    global _client
+    if settings.VECTOR_BACKEND == "local":
+        return None
+    with _registry_lock:
+        if _client is None:
+            _client = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+        return _client
 
 
-def get_pinecone_index(instance, index_name):
+def _ensure_index(instance, index_name):
     """
-    Pinecone 인덱스를 가져옵니다. 인덱스가 없으면 생성합니다.
+    인덱스가 없으면 생성합니다.
     """
-    # 인덱스가 없으면 생성
     if index_name not in [i.name for i in instance.list_indexes()]:
         # ServerlessSpec 정의
         spec = ServerlessSpec(
@@ -24,13 +47,143 @@ def get_pinecone_index(instance, index_name):
         )
         instance.create_index(
             name=index_name,
-            dimension=1536,  # text-embedding-ada-002의 차원 수
+            dimension=settings.VECTOR_DIMENSION,  # text-embedding-ada-002의 차원 수
             metric="cosine",  # 코사인 거리 측정
             spec=spec,
         )
 
-    # 기존 인덱스를 가져옴
-    return instance.Index(index_name)
+
+def get_pinecone_index(instance=None, index_name=None):
+    """
+    Pinecone 인덱스 핸들을 가져옵니다. 프로세스마다 한 번만 존재 확인 후 생성하고 이후에는 재사용합니다.
+    """
+    index_name = index_name or os.getenv("PINECONE_INDEX_NAME")
+    with _registry_lock:
+        if index_name not in _indexes and settings.VECTOR_BACKEND == "local":
+            from temp.vector_store import LocalVectorIndex
+
+            _indexes[index_name] = LocalVectorIndex(
+                os.path.join(settings.VECTOR_STORE_DIR, index_name),
+                dimension=settings.VECTOR_DIMENSION,
+            )
+        elif index_name not in _indexes:
+            instance = instance or get_pinecone_instance()
+            _ensure_index(instance, index_name)
+            # 일시적 오류 재시도 및 서킷 브레이커 적용, 인덱스를 찾지 못하면 핸들을 버리고 다음 호출에서 다시 확인
+            _indexes[index_name] = ResilientPineconeIndex(
+                instance.Index(index_name),
+                on_not_found=lambda: invalidate_pinecone_index(index_name),
+            )
+        return _indexes[index_name]
+
+
+def invalidate_pinecone_index(index_name):
+    """
+    인덱스 핸들을 레지스트리에서 제거 (다음 호출에서 존재 확인부터 다시 수행)
+    """
+    with _registry_lock:
+        _indexes.pop(index_name, None)
+
+
+def reset_pinecone_registry():
+    """
+    클라이언트와 인덱스 핸들을 모두 제거 (fork된 자식 프로세스에서 호출)
+    """
+    global _client, _registry_lock
+    _client = None
+    _indexes.clear()
+    _registry_lock = threading.RLock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=reset_pinecone_registry)
+
+
+def _record_size(record):
+    """
+    upsert 요청에서 레코드 하나가 차지하는 대략적인 크기 (JSON 직렬화 기준, 바이트)
+    """
+    record_id, values, metadata = record
+    return len(json.dumps({"id": record_id, "values": values, "metadata": metadata}, ensure_ascii=False).encode("utf-8"))
+
+
+def split_upsert_batches(records, max_records=None, max_bytes=None):
+    """
+    레코드 목록을 Pinecone upsert 요청 제한(벡터 수, 요청 크기) 이하의 묶음으로 분할
+    Args:
+        records: [(id, values, metadata)] 목록
+    Returns:
+        list: 레코드 묶음 목록
+    """
+    max_records = max_records or settings.PINECONE_UPSERT_MAX_RECORDS
+    max_bytes = max_bytes or settings.PINECONE_UPSERT_MAX_BYTES
+
+    batches = []
+    current = []
+    current_bytes = 0
+    for record in records:
+        size = _record_size(record)
+        if current and (len(current) >= max_records or current_bytes + size > max_bytes):
+            batches.append(current)
+            current = []
+            current_bytes = 0
+        current.append(record)
+        current_bytes += size
+
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _ingest_batch(index, namespace, pages, user_id):
+    """
+    페이지 묶음 하나를 임베딩하고 요청 제한에 맞춘 upsert 요청으로 업로드
+    """
+    # 임베딩이 없는 페이지만 모아 한 번에 벡터화 (중복 업로드로 재사용된 임베딩은 그대로 사용)
+    missing = [page["text"] for page in pages if not page.get("embedding")]
+    new_vectors = iter(get_embeddings(missing, call_site="ingest", user_id=user_id) if missing else [])
+
+    records = [
+        (page["id"], page.get("embedding") or next(new_vectors), page["metadata"])
+        for page in pages
+    ]
+    for batch in split_upsert_batches(records):
+        index.upsert(vectors=batch, namespace=namespace)
+
+    # 하이브리드 검색용 키워드 역색인에도 같은 ID로 추가 (실패해도 벡터 검색은 가능하므로 로그만 남김)
+    if settings.HYBRID_SEARCH_ENABLED:
+        try:
+            keyword_index.index_documents(namespace, [
+                {"id": page["id"], "text": page["text"]} for page in pages
+            ])
+        except Exception as e:
+            logger.warning(f"Failed to update keyword index for namespace {namespace}: {str(e)}")
+    return len(pages)
+
+
+def ingest_pages(index, namespace, pages, user_id=None, progress_callback=None):
+    """
+    페이지를 INGEST_BATCH_PAGES개씩 묶어 임베딩 요청 하나와 upsert 요청(들)로 Pinecone에 업로드
+    INGEST_CONCURRENCY가 1보다 크면 여러 묶음을 동시에 처리
+    Args:
+        pages: [{"id", "text", "metadata", "embedding"(선택)}] 목록
+        progress_callback: 묶음이 끝날 때마다 (처리된 페이지 수, 전체 페이지 수)로 호출
+    Returns:
+        int: 업로드한 페이지 수
+    """
+    batch_size = max(1, settings.INGEST_BATCH_PAGES)
+    batches = [pages[start:start + batch_size] for start in range(0, len(pages), batch_size)]
+    if not batches:
+        return 0
+
+    pages_done = 0
+    with ThreadPoolExecutor(max_workers=max(1, min(settings.INGEST_CONCURRENCY, len(batches)))) as executor:
+        futures = [executor.submit(_ingest_batch, index, namespace, batch, user_id) for batch in batches]
+        for future in as_completed(futures):
+            pages_done += future.result()
+            if progress_callback:
+                progress_callback(pages_done, len(pages))
+    return pages_done
 
 
 def query_pinecone_data(instance, index_name, redis_key, user_id):
@@ -58,11 +211,38 @@ def query_pinecone_original_text(instance, index_name, redis_key, user_id):
     return metadata.get("original_text")
 
 
+def fetch_file_page_vectors(instance, index_name, user_id, file_id, total_pages, batch_size=100):
+    """
+    Pinecone에서 특정 파일의 페이지별 벡터와 메타데이터를 조회
+    Returns:
+        dict: {페이지 번호: {"values": [...], "metadata": {...}}}
+    """
+    index = get_pinecone_index(instance, index_name)
+    page_vectors = {}
+
+    for start in range(1, total_pages + 1, batch_size):
+        # 업로드 경로에 따라 user_id 접두사가 있는 ID와 없는 ID가 모두 존재
+        id_to_page = {}
+        for page_number in range(start, min(start + batch_size, total_pages + 1)):
+            redis_key = f"pdf:{file_id}:page:{page_number}"
+            id_to_page[f"{user_id}:{redis_key}"] = page_number
+            id_to_page[redis_key] = page_number
+
+        result = index.fetch(ids=list(id_to_page), namespace=str(user_id))
+        for record_id, vector in result["vectors"].items():
+            page_vectors[id_to_page[record_id]] = {
+                "values": list(vector["values"]),
+                "metadata": dict(vector.get("metadata", {}) or {}),
+            }
+
+    return page_vectors
+
+
 def process_and_save_summary(redis_key, original_text, user_id):
     """
     텍스트 요약을 생성하고 MySQL에 저장
     """
-    summary_result = generate_summary(original_text)
+    summary_result = generate_summary(original_text, user_id=user_id)
     if summary_result["success"]:
         PineconeSummary.objects.create(
             redis_key=redis_key,
@@ -1,21 +1,17 @@
 import os
-import redis
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
-from collections import defaultdict
 from .tasks import upload_file_id_to_pinecone_task
 from .service import (
     get_pinecone_instance,
     query_pinecone_data
 )
 from temp.openaiService import get_embedding
-
-# Redis 클라이언트 설정
-redis_client = redis.StrictRedis(host="redis", port=6379, db=0)
+from temp.pdf.storage import get_pending_files
 
 
 class UploadAllToPineconeView(APIView):
@@ -36,23 +32,16 @@ class UploadAllToPineconeView(APIView):
             # 사용자 ID 가져오기
             user_id = request.user.id
 
-            # Redis에서 모든 키 가져오기
-            keys = redis_client.keys("pdf:*:page:*")
-            if not keys:
-                return Response({"error": "No data found in Redis."}, status=status.HTTP_404_NOT_FOUND)
+            # 사용자의 업로드 대기 파일 인덱스에서 file_id 조회 (전체 키 검색 없음)
+            file_ids = get_pending_files(user_id)
 
-            # file_id별로 키 그룹화
-            file_id_map = defaultdict(list)
-            for key in keys:
-                key_str = key.decode("utf-8")  # Redis 키는 바이트 형식이므로 문자열로 변환
-                parts = key_str.split(":")
-                file_id = parts[1]  # `pdf:<file_id>:page:<page_number>` 중 file_id 추출
-                file_id_map[file_id].append(key_str)
+            if not file_ids:
+                return Response({"error": "No data found in Redis."}, status=status.HTTP_404_NOT_FOUND)
 
             # 각 file_id별로 비동기 작업 실행
             tasks = []
-            for file_id, file_keys in file_id_map.items():
-                task = upload_file_id_to_pinecone_task.delay(file_id, file_keys, user_id)
+            for file_id in file_ids:
+                task = upload_file_id_to_pinecone_task.delay(file_id, user_id)
                 tasks.append({"file_id": file_id, "task_id": task.id})
 
             return Response({
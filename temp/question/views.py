@@ -2,13 +2,15 @@ import os
 from rest_framework.response import Response
 from rest_framework.utils import json
 from rest_framework.views import APIView
-from temp.openaiService import ask_openai, get_embedding  # OpenAI API 호출 함수
+from temp.openaiService import ask_openai_routed, parse_json_array, parse_true_false  # OpenAI API 호출 함수
 from .models import Question, UserAnswer
 from .serializer import WrongAnswerSerializer, AllQuestionsSerializer
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from temp.pinecone.service import get_pinecone_instance, get_pinecone_index
+from django.conf import settings
 from drf_yasg.utils import swagger_auto_schema
+from temp.rag import build_context, retrieve_topic_matches
 from drf_yasg import openapi
 import json
 
@@ -55,42 +57,16 @@ class TopicsAndQuestionsRAGView(APIView):
             pinecone_instance = get_pinecone_instance()
             pinecone_index = get_pinecone_index(pinecone_instance, os.getenv("PINECONE_INDEX_NAME"))
 
-            # 주제를 기반으로 Pinecone에서 연관 데이터 검색
-            related_contexts = []
-            for topic in topics:
-                # Pinecone에서 검색 수행
-                query_result = pinecone_index.query(
-                    namespace=str(user_id),
-                    top_k=10,
-                    include_metadata=True,
-                    vector=get_embedding(topic),  # 토픽에 대한 벡터 생성
-                )
-                for match in query_result.get("matches", []):
-                    related_contexts.append(match["metadata"].get("original_text", ""))
-
-            # 연관 데이터를 하나의 컨텍스트로 결합
-            related_context = "\n".join([ctx.strip() for ctx in related_contexts if ctx])
-
-            # genealogy 메타데이터에 기반한 데이터 수집
-            genealogy_related_contexts = []
-
-            # "category"가 "genealogy"인 데이터를 필터링하여 검색
-            genealogy_query_result = pinecone_index.query(
-                vector=[0] * 1536,
-                namespace=str(user_id),  # 사용자 네임스페이스 지정
-                top_k=10,
-                include_metadata=True,  # 메타데이터를 포함
-                filter={"category": "genealogy"}  # "category"가 "genealogy"인 데이터만 필터링
+            # 모든 토픽을 한 번에 임베딩하고 토픽별 검색과 genealogy 검색을 동시에 수행
+            matches_by_topic, genealogy_matches = retrieve_topic_matches(
+                pinecone_index, user_id, topics, include_genealogy=True
             )
 
-            # 검색된 결과에서 "original_text"를 수집
-            for match in genealogy_query_result.get("matches", []):
-                original_text = match["metadata"].get("original_text", "")
-                if original_text:  # original_text가 존재하는 경우만 추가
-                    genealogy_related_contexts.append(original_text.strip())
+            # 중복을 제거하고 토픽별로 토큰 예산을 나누어 하나의 컨텍스트로 결합
+            related_context = build_context(list(matches_by_topic.values()), settings.RAG_CONTEXT_TOKEN_BUDGET)
 
-            # 관련 텍스트를 하나로 결합
-            genealogy_context = "\n".join(genealogy_related_contexts)
+            # 관련 텍스트를 토큰 예산 안에서 하나로 결합
+            genealogy_context = build_context([genealogy_matches], settings.RAG_GENEALOGY_TOKEN_BUDGET)
 
             # 객관식 생성 위한 OpenAI API 호출
             multiple_choice_prompt = (
@@ -118,10 +94,14 @@ class TopicsAndQuestionsRAGView(APIView):
                 f"genealogy와 관련된 기존 문제:\n{genealogy_context}\n"
             )
 
-            multiple_choice_result = ask_openai(multiple_choice_prompt, max_tokens=4096)
+            multiple_choice_result = ask_openai_routed("question_generation", multiple_choice_prompt, parse=parse_json_array, call_site="question_create", user_id=user_id)
+            if not multiple_choice_result.get("success"):
+                # 재시도 후에도 OpenAI 호출이 실패했거나 응답 형식이 잘못된 경우
+                return Response({"error": f"Failed to generate questions: {multiple_choice_result.get('error')}"},
+                                status=status.HTTP_503_SERVICE_UNAVAILABLE)
 
-            # API 응답이 JSON 배열 형식으로 오도록 설정했으므로 바로 파싱
-            multiple_choices = json.loads(multiple_choice_result['response'])
+            # API 응답이 JSON 배열 형식으로 오도록 설정했으므로 파싱된 결과 사용
+            multiple_choices = multiple_choice_result["parsed"]
 
             # 확인용 로그
             logger.info("Parsed multiple choice questions: %s", multiple_choices)
@@ -169,10 +149,14 @@ class TopicsAndQuestionsRAGView(APIView):
                 f"genealogy와 관련된 기존 텍스트:\n{genealogy_context}\n"
             )
 
-            subjective_result = ask_openai(subjective_prompt, max_tokens=4096)
+            subjective_result = ask_openai_routed("question_generation", subjective_prompt, parse=parse_json_array, call_site="question_create", user_id=user_id)
+            if not subjective_result.get("success"):
+                # 재시도 후에도 OpenAI 호출이 실패했거나 응답 형식이 잘못된 경우
+                return Response({"error": f"Failed to generate questions: {subjective_result.get('error')}"},
+                                status=status.HTTP_503_SERVICE_UNAVAILABLE)
 
-            # API 응답이 JSON 배열 형식으로 오도록 설정했으므로 바로 파싱
-            subjectives = json.loads(subjective_result['response'])
+            # API 응답이 JSON 배열 형식으로 오도록 설정했으므로 파싱된 결과 사용
+            subjectives = subjective_result["parsed"]
 
             # 확인용 로그
             logger.info("Parsed subjective questions: %s", subjectives)
@@ -287,8 +271,8 @@ class SubmitAnswerAPIView(APIView):
                 )
 
                 # OpenAI API 호출
-                grading_result = ask_openai(grading_prompt, max_tokens=100)
-                is_correct = grading_result.get("response", "").strip().lower() == "true"
+                grading_result = ask_openai_routed("grading", grading_prompt, parse=parse_true_false, cache=True, user_id=request.user.id)
+                is_correct = grading_result.get("parsed") is True
 
 
             else:
@@ -307,7 +291,7 @@ class SubmitAnswerAPIView(APIView):
                     "이 문제의 해설을 자세히 설명해주세요. 가능한 경우, 문제의 배경이나 풀이 방법을 포함해주세요."
                 )
                 # OpenAI API 호출하여 해설 받기
-                explanation_result = ask_openai(explanation_prompt, max_tokens=1024)
+                explanation_result = ask_openai_routed("explanation", explanation_prompt, cache=True, user_id=request.user.id)
                 explanation = explanation_result.get("response", "해설을 생성할 수 없습니다.")
 
             # 사용자 답안 저장
@@ -477,7 +461,7 @@ class ConfusedAnswerView(APIView):
             )
 
             # OpenAI API 호출로 해설 생성
-            explanation_result = ask_openai(explanation_prompt, max_tokens=1024)
+            explanation_result = ask_openai_routed("explanation", explanation_prompt, cache=True, user_id=request.user.id)
             explanation = explanation_result.get("response", "해설을 생성할 수 없습니다.")
 
             # 해설 저장
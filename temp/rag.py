@@ -0,0 +1,245 @@
+import hashlib
+import logging
+import Levenshtein
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from temp import keyword_index
+from temp.chunker import count_tokens
+from temp.openaiService import get_embeddings
+
+logger = logging.getLogger(__name__)
+
+# RAG 프롬프트에 넣을 검색 결과(문단)를 토큰 예산 안에서 고르는 도구
+# 1) 같은/거의 같은 문단 제거 (점수가 가장 높은 쪽만 남김)
+# 2) 토픽마다 예산을 똑같이 나누어 점수 순으로 채우고, 남은 예산은 전체 점수 순으로 다시 채움
+# 3) 토픽 순서대로, 토픽 안에서는 점수 순서대로 이어 붙임
+
+
+def _normalize(text):
+    return " ".join(text.split())
+
+
+def _is_near_duplicate(text, kept_texts, threshold):
+    for kept in kept_texts:
+        # 길이 차이만으로 유사도가 threshold를 넘을 수 없으면 비교 생략
+        shorter, longer = sorted((len(text), len(kept)))
+        if longer and 2 * shorter / (shorter + longer) < threshold:
+            continue
+        if Levenshtein.ratio(text, kept) >= threshold:
+            return True
+    return False
+
+
+def deduplicate_passages(passages, threshold=None):
+    """
+    같은 문단과 거의 같은 문단(Levenshtein 유사도 threshold 이상)을 제거
+    Args:
+        passages: [{"topic_index", "text", "score"}] 목록
+    Returns:
+        list: 점수 높은 순으로 정렬된, 중복이 제거된 문단 목록
+    """
+    threshold = settings.RAG_NEAR_DUPLICATE_RATIO if threshold is None else threshold
+
+    seen_hashes = set()
+    kept = []
+    for passage in sorted(passages, key=lambda item: item["score"], reverse=True):
+        text = _normalize(passage["text"])
+        if not text:
+            continue
+
+        digest = hashlib.sha1(text.encode("utf-8")).hexdigest()
+        if digest in seen_hashes or _is_near_duplicate(text, [item["text"] for item in kept], threshold):
+            continue
+
+        seen_hashes.add(digest)
+        kept.append({**passage, "text": text})
+    return kept
+
+
+def build_context(matches_by_topic, budget_tokens, model="gpt-3.5-turbo"):
+    """
+    토픽별 검색 결과를 토큰 예산 안에서 하나의 컨텍스트로 합침
+    Args:
+        matches_by_topic: 토픽 순서대로 [(문단 텍스트, 검색 점수)] 목록의 목록
+        budget_tokens (int): 컨텍스트 전체 토큰 예산
+    Returns:
+        str: 합쳐진 컨텍스트
+    """
+    passages = [
+        {"topic_index": topic_index, "text": text or "", "score": score or 0}
+        for topic_index, matches in enumerate(matches_by_topic)
+        for text, score in matches
+    ]
+    passages = deduplicate_passages(passages)
+    for passage in passages:
+        passage["tokens"] = count_tokens(passage["text"], model)
+
+    selected = set()
+    used_tokens = 0
+
+    # 토픽별 몫: 예산을 토픽 수로 나누어 각 토픽이 점수 순으로 채움 (한 토픽이 예산을 독차지하지 않도록)
+    topic_share = budget_tokens // max(len(matches_by_topic), 1)
+    topic_used = {}
+    for position, passage in enumerate(passages):
+        used = topic_used.get(passage["topic_index"], 0)
+        if used + passage["tokens"] <= topic_share:
+            selected.add(position)
+            topic_used[passage["topic_index"]] = used + passage["tokens"]
+            used_tokens += passage["tokens"]
+
+    # 남은 예산: 토픽 구분 없이 점수 순으로 채움
+    for position, passage in enumerate(passages):
+        if position not in selected and used_tokens + passage["tokens"] <= budget_tokens:
+            selected.add(position)
+            used_tokens += passage["tokens"]
+
+    chosen = sorted(
+        (passages[position] for position in selected),
+        key=lambda item: (item["topic_index"], -item["score"]),
+    )
+    return "\n".join(passage["text"] for passage in chosen)
+
+
+def _vector_matches(index, namespace, vector, top_k, metadata_filter=None):
+    """
+    Pinecone 검색 결과를 [{"id", "score", "metadata"}] 목록으로 변환 (원문이 없는 결과 제외)
+    """
+    query = {"vector": vector, "namespace": namespace, "top_k": top_k, "include_metadata": True}
+    if metadata_filter:
+        query["filter"] = metadata_filter
+
+    return [
+        {"id": match.get("id"), "score": match.get("score"), "metadata": match.get("metadata") or {}}
+        for match in index.query(**query).get("matches", [])
+        if (match.get("metadata") or {}).get("original_text")
+    ]
+
+
+def _keyword_matches(namespace, query, top_k):
+    """
+    BM25 키워드 검색 (Redis 오류 시 벡터 검색 결과만 쓰도록 빈 목록 반환)
+    결과에는 metadata가 없으므로 합친 뒤 _attach_metadata로 원문을 채움
+    """
+    try:
+        return keyword_index.search(namespace, query, top_k)
+    except Exception as e:
+        logger.warning(f"Keyword search failed for namespace {namespace}: {str(e)}")
+        return []
+
+
+def reciprocal_rank_fusion(rankings, top_k, k=None):
+    """
+    여러 검색 결과 순위를 Reciprocal Rank Fusion으로 합침: score = Σ 1 / (k + 순위)
+    Args:
+        rankings: 점수 높은 순으로 정렬된 [{"id", "score", "metadata"(선택)}] 목록의 목록
+    Returns:
+        list: 합친 점수 높은 순 상위 top_k개 [{"id", "score", "metadata"}] (키워드 검색에만 있는 결과는 metadata가 None)
+    """
+    k = settings.RRF_K if k is None else k
+    fused = {}
+    for ranking in rankings:
+        for rank, match in enumerate(ranking, start=1):
+            entry = fused.setdefault(match["id"], {"id": match["id"], "score": 0.0, "metadata": None})
+            entry["score"] += 1 / (k + rank)
+            if entry["metadata"] is None:
+                entry["metadata"] = match.get("metadata")
+    return sorted(fused.values(), key=lambda item: item["score"], reverse=True)[:top_k]
+
+
+def _attach_metadata(index, namespace, match_lists):
+    """
+    metadata가 없는 결과(키워드 검색에만 있는 결과)의 원문을 벡터 인덱스에서 한 번에 fetch해 채움
+    벡터 인덱스에 없거나 원문이 없는 결과는 제외
+    Args:
+        match_lists: reciprocal_rank_fusion 결과 목록의 목록
+    Returns:
+        list: 입력과 같은 순서의 결과 목록의 목록
+    """
+    missing = list(dict.fromkeys(
+        match["id"] for matches in match_lists for match in matches if match["metadata"] is None
+    ))
+    fetched = {}
+    if missing:
+        try:
+            for record_id, vector in index.fetch(ids=missing, namespace=namespace)["vectors"].items():
+                fetched[record_id] = dict(vector.get("metadata", {}) or {})
+        except Exception as e:
+            logger.warning(f"Failed to fetch keyword match metadata for namespace {namespace}: {str(e)}")
+
+    results = []
+    for matches in match_lists:
+        attached = []
+        for match in matches:
+            metadata = match["metadata"] if match["metadata"] is not None else fetched.get(match["id"])
+            if metadata and metadata.get("original_text"):
+                attached.append({**match, "metadata": metadata})
+        results.append(attached)
+    return results
+
+
+def as_passages(matches):
+    """
+    검색 결과를 build_context 입력 형식 [(문단 텍스트, 점수)]로 변환
+    """
+    return [(match["metadata"].get("original_text", ""), match["score"]) for match in matches]
+
+
+def hybrid_search(index, namespace, query, vector, top_k=10):
+    """
+    벡터 검색과 BM25 키워드 검색을 함께 수행하고 RRF로 합침 (HYBRID_SEARCH_ENABLED가 False면 벡터 검색만)
+    Returns:
+        list: [{"id", "score", "metadata"}]
+    """
+    vector_matches = _vector_matches(index, namespace, vector, top_k)
+    if not settings.HYBRID_SEARCH_ENABLED:
+        return vector_matches
+    matches = reciprocal_rank_fusion([vector_matches, _keyword_matches(namespace, query, top_k)], top_k)
+    return _attach_metadata(index, namespace, [matches])[0]
+
+
+def retrieve_topic_matches(index, user_id, topics, top_k=10, include_genealogy=False, call_site="question_retrieval"):
+    """
+    여러 토픽의 관련 문단을 동시에 검색
+    1) 족보(genealogy) 검색과 토픽별 키워드(BM25) 검색은 임베딩과 무관하므로 먼저 시작
+    2) 모든 토픽을 한 번의 임베딩 요청으로 벡터화
+    3) 토픽별 벡터 검색을 RAG_QUERY_MAX_WORKERS개 스레드로 동시에 수행하고 키워드 검색 결과와 RRF로 합침
+    Returns:
+        (dict, list): ({토픽: [(문단 텍스트, 점수)]}, 족보 검색 결과 [(문단 텍스트, 점수)])
+    """
+    # 결과가 토픽별 dict이므로 중복 토픽은 한 번만 검색 (순서 유지, 중복 임베딩/검색 요청 방지)
+    topics = list(dict.fromkeys(topics))
+    namespace = str(user_id)
+    hybrid = settings.HYBRID_SEARCH_ENABLED
+    workers = max(1, min(settings.RAG_QUERY_MAX_WORKERS, len(topics) * (2 if hybrid else 1) + int(include_genealogy)))
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        genealogy_future = None
+        if include_genealogy:
+            # "category"가 "genealogy"인 데이터만 필터링하여 검색
+            genealogy_future = executor.submit(
+                _vector_matches, index, namespace, [0] * settings.VECTOR_DIMENSION, top_k, {"category": "genealogy"}
+            )
+
+        keyword_futures = {}
+        if hybrid:
+            keyword_futures = {topic: executor.submit(_keyword_matches, namespace, topic, top_k) for topic in topics}
+
+        topic_embeddings = get_embeddings(topics, call_site=call_site, user_id=user_id) if topics else []
+        vector_futures = {
+            topic: executor.submit(_vector_matches, index, namespace, topic_embedding, top_k)
+            for topic, topic_embedding in zip(topics, topic_embeddings)
+        }
+
+        matches_by_topic = {}
+        for topic, future in vector_futures.items():
+            matches = future.result()
+            if hybrid:
+                matches = reciprocal_rank_fusion([matches, keyword_futures[topic].result()], top_k)
+            matches_by_topic[topic] = matches
+        if hybrid:
+            # 키워드 검색에만 있는 결과의 원문은 모든 토픽을 모아 fetch 한 번으로 가져옴
+            matches_by_topic = dict(zip(matches_by_topic, _attach_metadata(index, namespace, list(matches_by_topic.values()))))
+        matches_by_topic = {topic: as_passages(matches) for topic, matches in matches_by_topic.items()}
+        genealogy_matches = as_passages(genealogy_future.result()) if genealogy_future else []
+
+    return matches_by_topic, genealogy_matches
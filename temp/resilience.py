@@ -0,0 +1,214 @@
+import logging
+import random
+import threading
+import time
+import openai
+import urllib3
+from django.conf import settings
+from prometheus_client import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+# 외부 API(OpenAI, Pinecone) 호출 공통 재시도/차단 계층
+# - 429, 5xx, 연결 오류, 타임아웃만 재시도 (지터를 섞은 지수 백오프, 호출별 마감 시간 안에서만)
+# - 공급자별 서킷 브레이커: 재시도 대상 오류가 연속 N번이면 일정 시간 동안 요청 없이 바로 실패 (open)
+#   대기 시간이 지나면 요청 하나만 시험 삼아 보내고 (half_open) 성공하면 다시 정상 (closed)
+
+CIRCUIT_STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+CIRCUIT_BREAKER_STATE = Gauge(
+    "circuit_breaker_state",
+    "서킷 브레이커 상태 (0: closed, 1: half_open, 2: open)",
+    ["provider"],
+    multiprocess_mode="livemax",  # 다중 프로세스 모드: 살아 있는 프로세스 중 가장 나쁜 상태 (한 워커라도 열리면 open)
+)
+
+EXTERNAL_CALL_RETRIES = Counter(
+    "external_call_retries_total",
+    "일시적 오류로 재시도한 외부 API 요청 수",
+    ["provider"],
+)
+
+EXTERNAL_CALL_REJECTIONS = Counter(
+    "external_call_rejections_total",
+    "서킷 브레이커가 열려 있어 보내지 않은 외부 API 요청 수",
+    ["provider"],
+)
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+RETRYABLE_ERRORS = (
+    openai.error.RateLimitError,
+    openai.error.ServiceUnavailableError,
+    openai.error.Timeout,
+    openai.error.APIConnectionError,
+    openai.error.TryAgain,
+    urllib3.exceptions.HTTPError,
+    ConnectionError,
+    TimeoutError,
+)
+
+
+class CircuitOpenError(Exception):
+    """
+    서킷 브레이커가 열려 있어 요청을 보내지 않고 실패
+    """
+
+
+class DeadlineExceededError(Exception):
+    """
+    호출별 마감 시간 안에 성공하지 못함
+    """
+
+
+def is_retryable(error):
+    status = getattr(error, "http_status", None) or getattr(error, "status", None)
+    if isinstance(status, int):
+        return status in RETRYABLE_STATUS
+    return isinstance(error, RETRYABLE_ERRORS)
+
+
+class CircuitBreaker:
+    def __init__(self, provider, failure_threshold, recovery_timeout):
+        self.provider = provider
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._set_state("closed")
+
+    def _set_state(self, state):
+        self.state = state
+        CIRCUIT_BREAKER_STATE.labels(self.provider).set(CIRCUIT_STATES[state])
+
+    def before_call(self):
+        """
+        요청을 보내도 되는지 확인 (열려 있으면 CircuitOpenError)
+        """
+        with self._lock:
+            if self.state == "closed":
+                return
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.recovery_timeout:
+                self._set_state("half_open")
+                self._trial_in_flight = False
+            if self.state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+
+        EXTERNAL_CALL_REJECTIONS.labels(self.provider).inc()
+        raise CircuitOpenError(f"{self.provider} circuit is open; failing fast")
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._trial_in_flight = False
+            if self.state != "closed":
+                logger.info(f"Circuit closed: {self.provider}")
+                self._set_state("closed")
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self.state == "half_open" or self._failures >= self.failure_threshold:
+                if self.state != "open":
+                    logger.warning(f"Circuit opened: {self.provider} ({self._failures} consecutive failures)")
+                self._opened_at = time.monotonic()
+                self._set_state("open")
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(provider):
+    with _breakers_lock:
+        if provider not in _breakers:
+            _breakers[provider] = CircuitBreaker(
+                provider,
+                failure_threshold=settings.CIRCUIT_FAILURE_THRESHOLD,
+                recovery_timeout=settings.CIRCUIT_RECOVERY_TIMEOUT,
+            )
+        return _breakers[provider]
+
+
+def backoff_delay(attempt):
+    """
+    지터를 섞은 지수 백오프 (full jitter): 0 ~ min(cap, base * 2^attempt) 사이 임의의 시간
+    """
+    return random.uniform(0, min(settings.RETRY_BACKOFF_CAP, settings.RETRY_BACKOFF_BASE * (2 ** attempt)))
+
+
+def call_with_retry(provider, func, deadline=None, max_attempts=None):
+    """
+    func(timeout)을 재시도/서킷 브레이커와 함께 호출
+    Args:
+        provider (str): 공급자 이름 (openai, pinecone). 서킷 브레이커와 지표 라벨로 사용
+        func: 남은 시간(초, 마감 시간이 없으면 None)을 받아 요청을 보내는 함수
+        deadline (float): 재시도를 포함한 전체 허용 시간 (초)
+        max_attempts (int): 최대 시도 횟수 (기본값: settings.RETRY_MAX_ATTEMPTS)
+    """
+    breaker = get_circuit_breaker(provider)
+    max_attempts = max_attempts or settings.RETRY_MAX_ATTEMPTS
+    expires_at = time.monotonic() + deadline if deadline else None
+
+    for attempt in range(max_attempts):
+        breaker.before_call()
+
+        remaining = expires_at - time.monotonic() if expires_at else None
+        try:
+            result = func(remaining)
+        except Exception as e:
+            if not is_retryable(e):
+                # 요청 자체의 문제(잘못된 입력, 인증 등)는 공급자 장애가 아니므로 그대로 전달
+                breaker.record_success()
+                raise
+            breaker.record_failure()
+
+            delay = backoff_delay(attempt)
+            if attempt == max_attempts - 1:
+                raise
+            if expires_at and time.monotonic() + delay >= expires_at:
+                raise DeadlineExceededError(f"{provider} call did not succeed within {deadline}s: {str(e)}") from e
+
+            logger.warning(f"{provider} call failed ({str(e)}); retrying in {delay:.2f}s (attempt {attempt + 1}/{max_attempts})")
+            EXTERNAL_CALL_RETRIES.labels(provider).inc()
+            time.sleep(delay)
+            continue
+
+        breaker.record_success()
+        return result
+
+
+class ResilientPineconeIndex:
+    """
+    Pinecone Index의 query/upsert/fetch/delete 호출을 call_with_retry로 감싼 래퍼
+    그 외 속성은 원래 Index 객체로 전달
+    on_not_found: 인덱스를 찾지 못해(404) 실패했을 때 호출할 함수
+    """
+
+    RETRIED_METHODS = ("query", "upsert", "fetch", "delete", "describe_index_stats")
+
+    def __init__(self, index, on_not_found=None):
+        self._index = index
+        self._on_not_found = on_not_found
+
+    def __getattr__(self, name):
+        attribute = getattr(self._index, name)
+        if name not in self.RETRIED_METHODS:
+            return attribute
+
+        def call(*args, **kwargs):
+            try:
+                return call_with_retry(
+                    "pinecone",
+                    lambda remaining: attribute(*args, **kwargs),
+                    deadline=settings.PINECONE_CALL_DEADLINE,
+                )
+            except Exception as e:
+                if getattr(e, "status", None) == 404 and self._on_not_found:
+                    self._on_not_found()
+                raise
+        return call
@@ -1,83 +1,65 @@
 from celery import shared_task
-from .services import get_pinecone_instance, get_pinecone_index
+from temp.pinecone.service import get_pinecone_instance, get_pinecone_index, ingest_pages
 import os
-import redis
-import json
-from temp.openaiService import get_embedding
+from temp.pdf.storage import get_meta, get_pages, page_text, get_pending_files, delete_document
 
 
-redis_client = redis.StrictRedis(host="redis", port=6379, db=0)
-
-
-@shared_task
-def upload_redis_to_pinecone(user_id):
+@shared_task(bind=True)
+def upload_redis_to_pinecone(self, user_id):
     """
     Redis 데이터를 Pinecone으로 업로드하는 작업
+    모든 대기 파일의 페이지를 묶음 단위로 임베딩/업로드하고 진행 상황은 태스크 상태(PROGRESS)의 meta로 보고
     """
+    def report_progress(pages_done, total_pages):
+        self.update_state(state="PROGRESS", meta={
+            "user_id": user_id,
+            "pages_done": pages_done,
+            "total_pages": total_pages,
+        })
+
     try:
-        # Redis에서 페이지 키와 메타 키 가져오기
-        page_keys = redis_client.keys("pdf:*:page:*")
-        meta_keys = redis_client.keys("pdf:*:meta")
+        # 사용자의 업로드 대기 파일 인덱스에서 file_id 조회 (전체 키 검색 없음)
+        file_ids = get_pending_files(user_id)
 
-        if not page_keys:
+        if not file_ids:
             return {"status": "error", "message": "No page data found in Redis."}
 
-        # 파일 메타데이터 맵 생성
-        file_meta_map = {}
-        for meta_key in meta_keys:
-            meta_data = redis_client.get(meta_key)
-            if meta_data:
-                meta_content = json.loads(meta_data.decode("utf-8"))
-                file_id = meta_key.decode("utf-8").split(":")[1]
-                file_meta_map[file_id] = meta_content.get("file_name", "unknown")
-
         # Pinecone 초기화
         instance = get_pinecone_instance()
         index_name = os.getenv("PINECONE_INDEX_NAME", "pdf-index")
         index = get_pinecone_index(instance, index_name)
 
-        # 페이지 데이터를 처리하여 Pinecone에 업로드
-        for key in sorted(page_keys):
-            page_data = redis_client.get(key)
-            if not page_data:
-                continue
-
-            page_content = json.loads(page_data.decode("utf-8"))
-            text_field = page_content.get("text")
-            page_number = page_content.get("page_number")
-
-            # Redis 키에서 file_id 추출
-            file_id = key.decode("utf-8").split(":")[1]
-            file_name = file_meta_map.get(file_id, "unknown")
-
-            # 텍스트 처리
-            if isinstance(text_field, dict) and "text" in text_field:
-                text = text_field["text"]
-            elif isinstance(text_field, str):
-                text = text_field
-            else:
-                continue
-
-            # 벡터 생성
-            vector = get_embedding(text)
-
-            # Pinecone에 업로드
-            index.upsert([
-                (
-                    f"{key.decode('utf-8')}",  # Redis 키를 데이터 ID로 사용
-                    vector,  # 생성된 벡터
-                    {  # 메타데이터
+        # 파일별로 메타데이터와 페이지 데이터를 한 번에 조회하여 업로드할 레코드 구성
+        records = []
+        for file_id in file_ids:
+            meta = get_meta(file_id) or {}
+            file_name = meta.get("file_name", "unknown")
+            category = determine_category(file_name)
+
+            for page_number, page_content in get_pages(file_id):
+                # 텍스트가 있는 페이지만 처리
+                text = page_text(page_content)
+                if text is None:
+                    continue
+                records.append({
+                    "id": f"pdf:{file_id}:page:{page_number}",  # Redis 페이지 경로를 데이터 ID로 사용
+                    "text": text,
+                    "embedding": page_content.get("embedding"),
+                    "metadata": {
                         "page_number": page_number,
                         "file_name": file_name,
                         "original_text": text,
-                        "category": determine_category(file_name),
+                        "category": category,
                         "user_id": user_id,  # 사용자 ID 추가
-                    }
-                )
-            ], namespace=str(user_id))
+                    },
+                })
+
+        # 여러 파일의 페이지를 함께 묶어 Pinecone에 업로드
+        ingest_pages(index, str(user_id), records, user_id=user_id, progress_callback=report_progress)
 
-        # Redis 데이터 전체 삭제
-        redis_client.flushdb()
+        # 업로드한 사용자의 파일 데이터만 삭제
+        for file_id in file_ids:
+            delete_document(file_id)
 
         return {"status": "success", "message": "All data uploaded to Pinecone successfully"}
 
@@ -0,0 +1,434 @@
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from contextlib import contextmanager
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Pinecone Index와 같은 인터페이스(upsert, query, fetch, delete, describe_index_stats)의 로컬 벡터 인덱스
+# settings.VECTOR_BACKEND == "local" 일 때 get_pinecone_index가 반환 (오프라인 실행, 벤치마크용)
+#
+# 저장 구조: {directory}/{namespace}/
+#   vectors.f32 : float32 (capacity, dimension) 단위 벡터 행렬 (memory-mapped, 앞쪽 count개 행만 사용)
+#   state.json  : {"version", "count", "capacity", "ids", "metadata", "norms"} (행 번호 순서)
+#   .lock       : 잠금 파일 (쓰기: 배타 잠금, 검색: 공유 잠금, 호출마다 따로 열어 스레드 간에도 적용)
+# 다른 프로세스(웹, Celery 워커)가 쓴 내용은 state.json의 (inode, 변경 시각, 크기)로 감지해 다시 읽음
+#   (state.json은 항상 새 파일로 교체되므로 변경 시각 해상도가 낮은 파일 시스템에서도 inode가 달라짐)
+# 행은 정규화해서 저장하고 원래 노름은 norms에 보관 (fetch, include_values는 원래 벡터로 복원)
+# 유사도는 코사인 (정규화한 질의 벡터와 행렬 곱 한 번), 삭제는 마지막 행을 빈 자리로 옮겨 행렬을 빈틈없이 유지
+
+VECTORS_FILE = "vectors.f32"
+STATE_FILE = "state.json"
+LOCK_FILE = ".lock"
+DEFAULT_NAMESPACE = "__default__"
+INITIAL_CAPACITY = 256
+MASK_CACHE_SIZE = 32
+
+
+def _namespace_dir_name(namespace):
+    """
+    네임스페이스를 디렉터리 이름으로 변환 (파일 이름에 쓸 수 없는 문자가 있으면 해시 사용)
+    """
+    if not namespace:
+        return DEFAULT_NAMESPACE
+    if re.fullmatch(r"[\w.-]+", namespace) and namespace not in (".", ".."):
+        return namespace
+    return hashlib.sha1(namespace.encode("utf-8")).hexdigest()
+
+
+def _condition_matches(value, condition):
+    """
+    메타데이터 값 하나가 Pinecone 필터 조건({"$eq": ...} 또는 값)을 만족하는지 확인
+    리스트 값은 원소 중 하나라도 만족하면 일치 ($ne, $nin은 모든 원소가 만족해야 일치)
+    """
+    if not isinstance(condition, dict):
+        condition = {"$eq": condition}
+
+    values = value if isinstance(value, list) else [value]
+    for operator, operand in condition.items():
+        if operator == "$eq":
+            matched = operand in values
+        elif operator == "$ne":
+            matched = operand not in values
+        elif operator == "$in":
+            matched = any(item in operand for item in values)
+        elif operator == "$nin":
+            matched = not any(item in operand for item in values)
+        elif operator == "$exists":
+            matched = (value is not None) == bool(operand)
+        elif operator in ("$gt", "$gte", "$lt", "$lte"):
+            if not isinstance(value, (int, float)) or isinstance(value, bool):
+                matched = False
+            elif operator == "$gt":
+                matched = value > operand
+            elif operator == "$gte":
+                matched = value >= operand
+            elif operator == "$lt":
+                matched = value < operand
+            else:
+                matched = value <= operand
+        else:
+            raise ValueError(f"Unsupported filter operator: {operator}")
+
+        if not matched:
+            return False
+    return True
+
+
+def matches_filter(metadata, metadata_filter):
+    """
+    메타데이터가 Pinecone 형식의 필터를 만족하는지 확인 ($and, $or 지원)
+    """
+    for key, condition in metadata_filter.items():
+        if key == "$and":
+            matched = all(matches_filter(metadata, item) for item in condition)
+        elif key == "$or":
+            matched = any(matches_filter(metadata, item) for item in condition)
+        else:
+            matched = _condition_matches(metadata.get(key), condition)
+        if not matched:
+            return False
+    return True
+
+
+class _Namespace:
+    """
+    네임스페이스 하나의 벡터 행렬과 ID/메타데이터 (디스크의 state.json, vectors.f32를 메모리에 적재)
+    """
+
+    def __init__(self, path, dimension):
+        self.path = path
+        self.dimension = dimension
+        self.state_signature = None
+        self.version = 0
+        self.count = 0
+        self.capacity = 0
+        self.ids = []
+        self.metadata = []
+        self.norms = []
+        self.rows = {}
+        self.vectors = None
+        self.masks = {}
+        self.mask_lock = threading.Lock()
+
+    def lock_path(self):
+        return os.path.join(self.path, LOCK_FILE)
+
+    def _state_path(self):
+        return os.path.join(self.path, STATE_FILE)
+
+    def _vectors_path(self):
+        return os.path.join(self.path, VECTORS_FILE)
+
+    def _state_signature(self):
+        try:
+            stat = os.stat(self._state_path())
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def invalidate(self):
+        """
+        메모리 상태를 버리고 다음 refresh에서 디스크 내용을 다시 읽게 함 (쓰기 도중 예외가 난 경우)
+        """
+        self.state_signature = None
+        self.capacity = 0
+        self.vectors = None
+        self.clear()
+
+    def refresh(self):
+        """
+        다른 프로세스가 state.json을 바꿨으면 다시 읽음
+        """
+        signature = self._state_signature()
+        if signature == self.state_signature:
+            return
+
+        if signature is None:
+            self.invalidate()
+            return
+
+        with open(self._state_path(), encoding="utf-8") as state_file:
+            state = json.load(state_file)
+
+        self.state_signature = signature
+        self.version = state["version"]
+        self.count = state["count"]
+        self.capacity = state["capacity"]
+        self.ids = state["ids"]
+        self.metadata = state["metadata"]
+        self.norms = state["norms"]
+        self.rows = {record_id: row for row, record_id in enumerate(self.ids)}
+        self.vectors = np.memmap(self._vectors_path(), dtype=np.float32, mode="r+", shape=(self.capacity, self.dimension))
+        self.masks = {}
+
+    def matrix(self):
+        """
+        사용 중인 행 (count, dimension)을 일반 ndarray 뷰로 반환 (memmap 서브클래스 연산 오버헤드 제거)
+        """
+        if self.vectors is None:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        return self.vectors[:self.count].view(np.ndarray)
+
+    def _grow(self, required):
+        """
+        행렬 용량이 부족하면 두 배씩 늘린 새 파일로 교체
+        """
+        if required <= self.capacity:
+            return
+
+        capacity = max(INITIAL_CAPACITY, self.capacity)
+        while capacity < required:
+            capacity *= 2
+
+        tmp_path = f"{self._vectors_path()}.tmp"
+        grown = np.memmap(tmp_path, dtype=np.float32, mode="w+", shape=(capacity, self.dimension))
+        if self.count:
+            grown[:self.count] = self.vectors[:self.count]
+        grown.flush()
+        del grown
+        os.replace(tmp_path, self._vectors_path())
+
+        self.capacity = capacity
+        self.vectors = np.memmap(self._vectors_path(), dtype=np.float32, mode="r+", shape=(capacity, self.dimension))
+
+    def upsert(self, records):
+        new_ids = [record_id for record_id, *_ in records if record_id not in self.rows]
+        self._grow(self.count + len(set(new_ids)))
+
+        for record_id, values, norm, metadata in records:
+            row = self.rows.get(record_id)
+            if row is None:
+                row = self.count
+                self.rows[record_id] = row
+                self.ids.append(record_id)
+                self.metadata.append(None)
+                self.norms.append(0.0)
+                self.count += 1
+            self.vectors[row] = values
+            self.metadata[row] = metadata or {}
+            self.norms[row] = norm
+
+        return len(records)
+
+    def delete(self, ids):
+        for record_id in ids:
+            row = self.rows.pop(record_id, None)
+            if row is None:
+                continue
+
+            # 마지막 행을 삭제된 자리로 옮김
+            last = self.count - 1
+            if row != last:
+                self.vectors[row] = self.vectors[last]
+                self.ids[row] = self.ids[last]
+                self.metadata[row] = self.metadata[last]
+                self.norms[row] = self.norms[last]
+                self.rows[self.ids[row]] = row
+            self.ids.pop()
+            self.metadata.pop()
+            self.norms.pop()
+            self.count -= 1
+
+    def clear(self):
+        self.rows = {}
+        self.ids = []
+        self.metadata = []
+        self.norms = []
+        self.count = 0
+
+    def save(self):
+        """
+        행렬을 디스크에 반영하고 state.json을 원자적으로 교체
+        """
+        if self.vectors is not None:
+            self.vectors.flush()
+
+        self.version += 1
+        state = {
+            "version": self.version,
+            "count": self.count,
+            "capacity": self.capacity,
+            "ids": self.ids,
+            "metadata": self.metadata,
+            "norms": self.norms,
+        }
+        tmp_path = f"{self._state_path()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as state_file:
+            json.dump(state, state_file, ensure_ascii=False)
+        os.replace(tmp_path, self._state_path())
+
+        self.state_signature = self._state_signature()
+        self.masks = {}
+
+    def values(self, row):
+        """
+        정규화 전 원래 벡터 값
+        """
+        return (self.vectors[row] * self.norms[row]).tolist()
+
+    def filter_mask(self, metadata_filter):
+        """
+        필터를 만족하는 행의 bool 배열 (같은 필터는 데이터가 바뀌기 전까지 재사용)
+        """
+        key = json.dumps(metadata_filter, sort_keys=True, ensure_ascii=False)
+        mask = self.masks.get(key)
+        if mask is None:
+            mask = np.fromiter(
+                (matches_filter(metadata, metadata_filter) for metadata in self.metadata),
+                dtype=bool,
+                count=self.count,
+            )
+            # 공유 잠금 아래에서 여러 스레드가 동시에 검색하므로 캐시 교체만 스레드 잠금으로 보호
+            with self.mask_lock:
+                if len(self.masks) >= MASK_CACHE_SIZE:
+                    self.masks.pop(next(iter(self.masks)))
+                self.masks[key] = mask
+        return mask
+
+
+class LocalVectorIndex:
+    """
+    memory-mapped NumPy 행렬 기반 로컬 벡터 인덱스 (Pinecone Index 대체)
+    반환 값은 Pinecone 응답과 같은 키를 가진 dict
+    """
+
+    def __init__(self, directory, dimension=1536):
+        self.directory = directory
+        self.dimension = dimension
+        self._namespaces = {}
+        self._lock = threading.RLock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _namespace(self, namespace):
+        path = os.path.join(self.directory, _namespace_dir_name(namespace))
+        if path not in self._namespaces:
+            os.makedirs(path, exist_ok=True)
+            self._namespaces[path] = _Namespace(path, self.dimension)
+        return self._namespaces[path]
+
+    @contextmanager
+    def _locked(self, namespace, exclusive):
+        """
+        파일 잠금을 잡고 최신 상태의 네임스페이스를 반환
+        잠금 파일을 호출마다 따로 열어 같은 프로세스의 스레드끼리도 공유/배타 잠금이 적용되므로
+        스레드 잠금은 네임스페이스 조회와 refresh에만 사용 (검색끼리는 동시에 실행)
+        """
+        with self._lock:
+            entry = self._namespace(namespace)
+        with open(entry.lock_path(), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                with self._lock:
+                    entry.refresh()
+                yield entry
+            except BaseException:
+                if exclusive:
+                    entry.invalidate()
+                raise
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _normalize_record(self, record):
+        if isinstance(record, dict):
+            record_id, values, metadata = record["id"], record["values"], record.get("metadata")
+        else:
+            record_id, values = record[0], record[1]
+            metadata = record[2] if len(record) > 2 else None
+
+        values = np.asarray(values, dtype=np.float32)
+        if values.shape != (self.dimension,):
+            raise ValueError(f"Vector dimension {values.shape[-1] if values.ndim else 0} does not match index dimension {self.dimension}")
+        norm = float(np.linalg.norm(values))
+        if norm > 0:
+            values = values / norm
+        return str(record_id), values, norm, metadata
+
+    def upsert(self, vectors, namespace=""):
+        records = [self._normalize_record(record) for record in vectors]
+        with self._locked(namespace, exclusive=True) as entry:
+            upserted = entry.upsert(records)
+            entry.save()
+        return {"upserted_count": upserted}
+
+    def query(self, vector=None, top_k=10, namespace="", filter=None, include_values=False, include_metadata=False, id=None, **kwargs):
+        with self._locked(namespace, exclusive=False) as entry:
+            if id is not None:
+                row = entry.rows.get(id)
+                if row is None:
+                    return {"matches": [], "namespace": namespace}
+                vector = entry.vectors[row]
+
+            if entry.count == 0 or top_k <= 0:
+                return {"matches": [], "namespace": namespace}
+
+            query_vector = np.asarray(vector, dtype=np.float32)
+            query_norm = float(np.linalg.norm(query_vector))
+            if query_norm > 0:
+                query_vector = query_vector / query_norm
+            scores = entry.matrix() @ query_vector
+
+            candidates = np.flatnonzero(entry.filter_mask(filter)) if filter else np.arange(entry.count)
+            if len(candidates) == 0:
+                return {"matches": [], "namespace": namespace}
+
+            candidate_scores = scores[candidates]
+            k = min(top_k, len(candidates))
+            top = np.argpartition(-candidate_scores, k - 1)[:k]
+            top = top[np.argsort(-candidate_scores[top], kind="stable")]
+
+            matches = []
+            for position in top:
+                row = int(candidates[position])
+                match = {"id": entry.ids[row], "score": float(candidate_scores[position])}
+                if include_values:
+                    match["values"] = entry.values(row)
+                if include_metadata:
+                    match["metadata"] = dict(entry.metadata[row])
+                matches.append(match)
+
+        return {"matches": matches, "namespace": namespace}
+
+    def fetch(self, ids, namespace=""):
+        with self._locked(namespace, exclusive=False) as entry:
+            vectors = {}
+            for record_id in ids:
+                row = entry.rows.get(record_id)
+                if row is not None:
+                    vectors[record_id] = {
+                        "id": record_id,
+                        "values": entry.values(row),
+                        "metadata": dict(entry.metadata[row]),
+                    }
+        return {"vectors": vectors, "namespace": namespace}
+
+    def delete(self, ids=None, delete_all=False, namespace="", filter=None, **kwargs):
+        with self._locked(namespace, exclusive=True) as entry:
+            if delete_all:
+                entry.clear()
+            else:
+                targets = list(ids or [])
+                if filter:
+                    targets += [entry.ids[row] for row in np.flatnonzero(entry.filter_mask(filter))]
+                entry.delete(targets)
+            entry.save()
+        return {}
+
+    def describe_index_stats(self, **kwargs):
+        namespaces = {}
+        for name in sorted(os.listdir(self.directory)):
+            if not os.path.isdir(os.path.join(self.directory, name)):
+                continue
+            with self._locked(name, exclusive=False) as entry:
+                if entry.count:
+                    namespaces[name] = {"vector_count": entry.count}
+        return {
+            "dimension": self.dimension,
+            "namespaces": namespaces,
+            "total_vector_count": sum(item["vector_count"] for item in namespaces.values()),
+        }
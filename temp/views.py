@@ -1,4 +1,3 @@
-import redis
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
@@ -6,9 +5,7 @@ from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from .openaiService import generate_summary, generate_problem
 from temp.models import Summary, Problem  # MySQL 모델 가져오기
-
-# Redis 클라이언트 설정
-redis_client = redis.StrictRedis(host="redis", port=6379, db=0)
+from temp.pdf.storage import get_pages, page_text
 
 
 class ProcessRedisDataView(APIView):
@@ -50,20 +47,16 @@ class ProcessRedisDataView(APIView):
 
         for file_id in file_ids:
             try:
-                # Redis에서 데이터 가져오기
-                keys = redis_client.keys(f"pdf:{file_id}:page:*")
-                if not keys:
+                # Redis에서 파일의 모든 페이지를 한 번에 가져오기
+                pages = get_pages(file_id)
+                if not pages:
                     errors.append({"file_id": file_id, "error": "No data found for the given file_id"})
                     continue
 
                 # Redis 데이터를 하나의 텍스트로 합치기
                 full_text = ""
-                for key in sorted(keys):
-                    page_data = redis_client.get(key)
-                    if not page_data:
-                        continue
-                    page_text = page_data.decode('utf-8')
-                    full_text += page_text + "\n"
+                for _, page_data in pages:
+                    full_text += (page_text(page_data) or "") + "\n"
 
                 # Action 처리
                 if action == "summary":
@@ -1,7 +1,8 @@
 from django.urls import path
-from .views import RegisterView, LoginView
+from .views import RegisterView, LoginView, UsageView
 
 urlpatterns = [
     path('signup', RegisterView.as_view()),
     path('login', LoginView.as_view()),
+    path('usage', UsageView.as_view()),
 ]
@@ -1,7 +1,10 @@
 from django.contrib.auth.models import User
 from rest_framework import generics, status
 from rest_framework.response import Response
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.views import APIView
+from drf_yasg.utils import swagger_auto_schema
+from temp.metrics import get_user_usage
 
 from .serializers import RegisterSerializer, LoginSerializer
 
@@ -20,3 +23,14 @@ class LoginView(generics.GenericAPIView):
         serializer.is_valid(raise_exception=True)
         token = serializer.validated_data  # validate()의 리턴값인 token을 받아온다.
         return Response({"token": token.key}, status=status.HTTP_200_OK)
+
+
+class UsageView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_description="현재 사용자의 OpenAI 누적 사용량 (요청 수, 프롬프트/응답 토큰 수) 전체 및 호출 위치별 조회",
+        responses={200: "{\"total\": {...}, \"call_sites\": {\"grading\": {...}, ...}}"},
+    )
+    def get(self, request):
+        return Response(get_user_usage(request.user.id), status=status.HTTP_200_OK)